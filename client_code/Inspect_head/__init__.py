@@ -10,6 +10,7 @@ import validation_head
 from ..ref_marking import ref_marking
 from ..ref_sample import ref_sample
 from ..summary import summary
+from .. import sampling_plan
 
 """VARIABLES"""
 STATUS_IN_PROGRESS = "In Progress"
@@ -35,6 +36,8 @@ class Inspect_head(Inspect_headTemplate):
     self.prod_code_box.placeholder = "Select Code"
     # Load initial product lines
     self.load_product_lines()
+    # Questions etc. returned with the save of a new header (see _section_bootstrap)
+    self.bootstrap = None
 
   # ---------------------------
   # UI STATE HELPERS
@@ -91,8 +94,7 @@ class Inspect_head(Inspect_headTemplate):
     self.ins_date_box.date  = data.get("ins_date")
     self.po_numb_box.text   = data.get("po_numb", "")
     self.rel_numb_box.text  = data.get("rel_numb", "")
-    self.series_box.selected_value    = data.get("series", "")
-    self.prod_code_box.selected_value = data.get("prod_code", "")
+    self.load_part_selection(data.get("series"), data.get("prod_code"))
     self.ord_qty_box.text   = "" if data.get("ord_qty") is None else str(data["ord_qty"])
     self.lot_qty_box.text   = "" if data.get("lot_qty") is None else str(data["lot_qty"])
     self.sam_qty_box.text   = "" if data.get("sam_qty") is None else str(data["sam_qty"])
@@ -104,6 +106,7 @@ class Inspect_head(Inspect_headTemplate):
     self.clear_header_fields()
     self.enable_header_fields(True)
     self.content_panel.clear()
+    self.bootstrap = None
 
 
   def savehead_btn_click(self, **event_args):
@@ -119,13 +122,26 @@ class Inspect_head(Inspect_headTemplate):
 
     if is_insert:
       status = STATUS_IN_PROGRESS
-      code = anvil.server.call(
-        "save_head",
-        header["ins_date"], header["po_numb"], header["rel_numb"],
-        header["series"], header["prod_code"],
-        header["ord_qty"], header["lot_qty"], header["sam_qty"],
-        status
-      )
+      result = self._save_new_head(header, status)
+
+      # The server found an open inspection of the same PO/release/product code
+      if result.get("duplicate"):
+        choice = alert(
+          f"Inspection {result['id_head']} is already open for PO {header['po_numb']}, "
+          f"release {header['rel_numb']}, product {header['prod_code']}.\n\n"
+          "Resume it instead of starting a duplicate?",
+          buttons=[("Resume", "resume"), ("Create New Anyway", "new"), ("Cancel", None)],
+          large=True
+        )
+        if choice == "resume":
+          self.resume_inspection(result)
+          return
+        if choice != "new":
+          return
+        result = self._save_new_head(header, status, allow_duplicate=True)
+
+      self.bootstrap = result
+      code = self.bootstrap["id_head"]
       # Reflect saved state in UI
       self.id_head_box.text   = code
       self.status_box.text    = status
@@ -134,13 +150,7 @@ class Inspect_head(Inspect_headTemplate):
       Notification("Header Saved").show()
 
       # Enables next step(s) in inspection process
-      self.doc_chk_btn.enabled = True
-      self.vis_chk_btn.enabled = True
-      self.dim_chk_btn.enabled = True
-      self.func_chk_btn.enabled = True
-      self.btn_marking.enabled = True
-      self.btn_sampling.enabled = True
-      self.btn_complete.enabled = True
+      self.enable_inspection_steps()
 
       '''' I took this out because I wanted sidebar buttons to handle the flow
           I added to method: def doc_chk_btn_click(self, **event_args):
@@ -156,6 +166,8 @@ class Inspect_head(Inspect_headTemplate):
         header["series"], header["prod_code"],
         header["ord_qty"], header["lot_qty"], header["sam_qty"]
       )
+      # The series may have changed, so let the forms fetch their own questions
+      self.bootstrap = None
       self.update_dt_box.text = now.strftime("%Y-%m-%d")
       self.update_t_box.text  = now.strftime("%H:%M:%S")
       Notification("Header Updated").show()
@@ -163,11 +175,50 @@ class Inspect_head(Inspect_headTemplate):
       # Enables next step in inspection process
       self.doc_chk_btn.enabled = True
 
+  def _save_new_head(self, header, status, allow_duplicate=False):
+    # One round trip: the new ID plus the question sets of every section
+    return anvil.server.call(
+      "save_head",
+      header["ins_date"], header["po_numb"], header["rel_numb"],
+      header["series"], header["prod_code"],
+      header["ord_qty"], header["lot_qty"], header["sam_qty"],
+      status,
+      bootstrap=True,
+      allow_duplicate=allow_duplicate
+    )
+
+  def enable_inspection_steps(self):
+    self.doc_chk_btn.enabled = True
+    self.vis_chk_btn.enabled = True
+    self.dim_chk_btn.enabled = True
+    self.func_chk_btn.enabled = True
+    self.btn_marking.enabled = True
+    self.btn_sampling.enabled = True
+    self.btn_complete.enabled = True
+
+  def resume_inspection(self, duplicate):
+    """Switch the header to an existing open inspection returned by save_head."""
+    existing = duplicate["header"]
+    self.write_header_to_ui(existing)
+    self.id_head_box.text = duplicate["id_head"]
+    self.status_box.text  = existing.get("status") or ""
+    if existing.get("update_dt"):
+      self.update_dt_box.text = existing["update_dt"].strftime("%Y-%m-%d")
+      self.update_t_box.text  = existing["update_dt"].strftime("%H:%M:%S")
+    # Answers are already saved on the resumed inspection: without a bootstrap
+    # each section form loads them (with their versions) before it can save,
+    # and no form of the previous header may stay open to save over them
+    self.bootstrap = None
+    self.content_panel.clear()
+    self.enable_inspection_steps()
+    Notification(f"Resumed inspection {duplicate['id_head']}").show()
+
   # Loads the Document Check Form
   def doc_chk_btn_click(self, **event_args):
     # Immediately open the Documentation step, passing the header id
     self.content_panel.clear()
-    self.content_panel.add_component(inspect_doc(inspection_id=self.id_head_box.text))
+    self.content_panel.add_component(inspect_doc(inspection_id=self.id_head_box.text,
+                                                 **self._section_bootstrap('document')))
 
   # Loads the Visual Check Form
   def vis_chk_btn_click(self, **event_args):
@@ -180,7 +231,8 @@ class Inspect_head(Inspect_headTemplate):
     self.visual_form = inspect_visual(
       inspection_id=self.id_head_box.text,
       product_series=self.series_box.selected_value or "",
-      sample_size=int(self.sam_qty_box.text)  
+      sample_size=int(self.sam_qty_box.text),
+      **self._section_bootstrap('visual')
     )
     # Add the form to the content panel
     self.content_panel.add_component(self.visual_form)
@@ -194,7 +246,8 @@ class Inspect_head(Inspect_headTemplate):
     self.dimension_form = inspect_dimension(
       inspection_id=self.id_head_box.text,
       product_series=self.series_box.selected_value or "",
-      sample_size=int(self.sam_qty_box.text or 1)
+      sample_size=int(self.sam_qty_box.text or 1),
+      **self._section_bootstrap('dimension')
     )
     self.content_panel.add_component(self.dimension_form)
 
@@ -207,10 +260,30 @@ class Inspect_head(Inspect_headTemplate):
     self.functional_form = inspect_functional(
       inspection_id=self.id_head_box.text,
       product_series=self.series_box.selected_value or "",
-      sample_size=int(self.sam_qty_box.text or 1)
+      sample_size=int(self.sam_qty_box.text or 1),
+      **self._section_bootstrap('functional')
     )
     self.content_panel.add_component(self.functional_form)
 
+  def _section_bootstrap(self, section):
+    """
+    Preloaded data for opening a section form of the inspection just created.
+    
+    Questions are reused on every open. The empty result versions are only
+    valid until the section is first saved, so they are handed out once.
+    
+    Returns:
+        dict of extra form properties (empty if there is no bootstrap)
+    """
+    if not self.bootstrap or self.bootstrap["id_head"] != self.id_head_box.text:
+      return {}
+
+    preload = {"questions": self.bootstrap["questions"][section]}
+    versions = self.bootstrap["result_versions"].pop(section, None)
+    if versions is not None:
+      preload["result_versions"] = versions
+    return preload
+
   def _validate_current_form_before_navigation(self):
     """
     Helper method to validate the current form before navigating away.
@@ -406,10 +479,53 @@ class Inspect_head(Inspect_headTemplate):
         print(f"Error loading part codes: {str(e)}")
         Notification(f"Error loading part codes: {str(e)}", style='danger').show()
 
+  def load_part_selection(self, series, prod_code):
+    """
+    Show a saved series and part code in the cascading dropdowns.
+    Each level's items are loaded before its value is set, as the change
+    handlers do, so the selections are valid.
+    """
+    self.series_box.items = []
+    self.series_box.selected_value = None
+    self.prod_code_box.items = []
+    self.prod_code_box.selected_value = None
+    if not series:
+      return
+
+    try:
+      choice = anvil.server.call('get_part_selection', series, prod_code)
+    except Exception as e:
+      print(f"Error loading part selection: {str(e)}")
+      Notification(f"Error loading part selection: {str(e)}", style='danger').show()
+      return
+
+    if choice['line']:
+      self.line_box.selected_value = choice['line']
+    self.series_box.items = choice['series_list']
+    self.series_box.selected_value = series
+    self.prod_code_box.items = choice['part_codes']
+    self.prod_code_box.selected_value = prod_code or None
+
   def prod_code_box_change(self, **event_args):
     """This method is called when an item is selected"""
     pass
 
+  def lot_qty_box_change(self, **event_args):
+    """
+    When lot size changes:
+    - Look up the Z1.4 sampling plan locally (no server call)
+    - Fill sam_qty_box with the plan's sample size
+    - Show the accept/reject numbers as the sample box tooltip
+    """
+    plan = sampling_plan.get_plan(self._to_int_or_none(self.lot_qty_box.text),
+                                  tier=self.vend_tier_box.text or sampling_plan.DEFAULT_TIER)
+    if plan:
+      self.sam_qty_box.text = str(plan['sample_size'])
+      self.sam_qty_box.tooltip = (f"Code {plan['code_letter']}, AQL {plan['aql']}: "
+                                  f"accept {plan['accept']}, reject {plan['reject']}")
+    else:
+      self.sam_qty_box.tooltip = ""
+
   def btn_servertest_click(self, **event_args):
     """Test SQL connection"""
     with anvil.server.no_loading_indicator:
@@ -429,7 +545,7 @@ class Inspect_head(Inspect_headTemplate):
     """
     Complete the inspection and create summary record.
     
-    This method:
+    This method (a single complete_inspection server call):
     1. Validates all inspection sections are complete
     2. Calculates rejection metrics (unit_rejects and all_rejects)
     3. Creates summary record in inspect_summary table
@@ -458,21 +574,9 @@ class Inspect_head(Inspect_headTemplate):
     if not user_confirmed:
       return
 
-    # Show progress
-    with Notification("Validating inspection data...", style='info'):
-      # Validate that all sections have been completed
-      validation_result = anvil.server.call('validate_inspection_complete', inspection_id)
-
-    if not validation_result['valid']:
-      alert(
-        f"Cannot complete inspection. Missing data:\n\n{validation_result['message']}\n\n"
-        "Please complete all inspection sections before finalizing."
-      )
-      return
-
-    # Complete the inspection
+    # Complete the inspection (the server validates, calculates and locks in one pass)
     try:
-      with Notification("Creating summary and locking data...", style='info'):
+      with Notification("Validating data, creating summary and locking data...", style='info'):
         result = anvil.server.call(
           'complete_inspection',
           inspection_id,
@@ -484,6 +588,13 @@ class Inspect_head(Inspect_headTemplate):
           self.sam_qty_box.text
         )
 
+      if result.get('missing_sections'):
+        alert(
+          f"Cannot complete inspection. Missing data:\n\n{result['message']}\n\n"
+          "Please complete all inspection sections before finalizing."
+        )
+        return
+
       if result['success']:
         # Show success with metrics
         alert(
@@ -527,6 +638,25 @@ class Inspect_head(Inspect_headTemplate):
 
     self.show_summary_form(inspection_id)
 
+  def btn_report_click(self, **event_args):
+    """
+    Download the full inspection report.
+    
+    The report is rendered once on the server and cached until a result changes,
+    so repeated downloads are immediate.
+    """
+    inspection_id = self.id_head_box.text
+
+    if not inspection_id:
+      alert("No inspection loaded. Please create or load an inspection first.")
+      return
+
+    result = anvil.server.call('get_inspection_report', inspection_id)
+    if result['ready']:
+      download(result['report'])
+    else:
+      Notification(result['message']).show()
+
   def show_summary_form(self, inspection_id):
     """
     Display the summary form for a specific inspection in the content panel.
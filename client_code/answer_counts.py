@@ -0,0 +1,68 @@
+# Client Code → Modules → answer_counts.py
+#
+# Completeness of a section's answers, worked out from the data
+# (sample_results and the question list) rather than the rendered rows.
+#
+# Each sample-based section form keeps a counts dict, updated whenever a
+# sample's answers are stored:
+#   {'answered': 57, 'unanswered': 7,
+#    'by_sample': {'sample_1': ['Q003'], 'sample_2': [], ...}}
+# Samples not visited yet count as entirely unanswered, so the totals cover
+# the whole section. A full recount is O(questions × samples) over plain dicts.
+# Optional questions (question['optional'], from the is_optional column) are
+# left out of the counts.
+
+# Answers that leave a question unanswered
+UNANSWERED = (None, '', 'Not Answered')
+
+
+def is_answered(result) -> bool:
+  """True if a stored result dict holds an answer."""
+  return bool(result) and result.get('pass_fail') not in UNANSWERED
+
+
+def required_count(questions) -> int:
+  """Number of questions that must be answered in each sample."""
+  return sum(1 for q in questions if not q.get('optional'))
+
+
+def missing_questions(questions, answers) -> list:
+  """
+  Required question IDs with no answer in one sample's (or the lot's) answers.
+
+  Args:
+      questions: Question dicts, in display order
+      answers: {question_id: result dict}
+  """
+  return [q['question_id'] for q in questions
+          if not q.get('optional') and not is_answered(answers.get(q['question_id']))]
+
+
+def update_sample(counts, questions, sample_key, answers) -> list:
+  """
+  Recount one sample and adjust the running totals.
+
+  Returns:
+      The question IDs still unanswered in that sample
+  """
+  required = required_count(questions)
+  previous = counts['by_sample'].get(sample_key)
+  if previous is not None:
+    counts['answered'] -= required - len(previous)
+    counts['unanswered'] -= len(previous)
+
+  missing = missing_questions(questions, answers)
+  counts['by_sample'][sample_key] = missing
+  counts['answered'] += required - len(missing)
+  counts['unanswered'] += len(missing)
+  return missing
+
+
+def recount(questions, sample_results, sample_size) -> dict:
+  """Counts for every sample of a section, from scratch."""
+  counts = {'answered': 0, 'unanswered': 0, 'by_sample': {}}
+  for sample in range(1, sample_size + 1):
+    sample_key = f"sample_{sample}"
+    update_sample(counts, questions, sample_key, sample_results.get(sample_key, {}))
+  return counts
+
@@ -3,13 +3,25 @@
 from ._anvil_designer import row_questionsTemplate
 from anvil import *
 import anvil.server
+from ... import photo_resize
 
 class row_questions(row_questionsTemplate):
   def __init__(self, **properties):
     self.init_components(**properties)
+    self.bind_item(self.item)
+
+  def bind_item(self, item):
+    """
+    Show a question/sample in this row, replacing whatever it showed before.
+
+    Called on creation, and by the parent form to reuse the row for another
+    sample instead of recreating it.
+    """
+    self.item = item
 
     # Store the photo reference separately to prevent loss
     self.stored_photo = None
+    self.image_fl.clear()
 
     # Display the question
     self.label_question.text = f"{self.item['question_id']}. {self.item['question_text']}"
@@ -20,6 +32,25 @@ class row_questions(row_questionsTemplate):
     self.radio_button_pass.group_name = group_name
     self.radio_button_fail.group_name = group_name
     self.radio_button_na.group_name = group_name
+    self.radio_button_pass.selected = False
+    self.radio_button_fail.selected = False
+    self.radio_button_na.selected = False
+
+    # Measured characteristics (questions with a nominal value) also take the actual measurement
+    if self.item.get('nominal') is not None:
+      self.usl = self.item['nominal'] + (self.item.get('tol_plus') or 0)
+      self.lsl = self.item['nominal'] - (self.item.get('tol_minus') or 0)
+      unit = self.item.get('unit') or ''
+      self.label_spec.text = f"Spec {self.lsl:g} – {self.usl:g} {unit}".strip()
+      self.label_spec.visible = True
+      self.text_box_measured.placeholder = f"Measured {unit}".strip()
+      self.text_box_measured.text = self.item.get('measured_value')
+      self.text_box_measured.visible = True
+      self.text_box_measured_change()
+    else:
+      self.label_spec.visible = False
+      self.text_box_measured.text = None
+      self.text_box_measured.visible = False
 
     # Initialize notes visibility and content
     self.text_area_notes.text = self.item.get('notes', '')
@@ -50,8 +81,8 @@ class row_questions(row_questionsTemplate):
   def image_fl_change(self, file, **event_args):
     """Handle file upload changes for dimension check photos"""
     if file:
-      # Store the new photo
-      self.stored_photo = file
+      # Store the new photo, downscaled for upload (see photo_resize)
+      self.stored_photo = photo_resize.downscale(file)
       self.label_photo_status.text = "✓ Photo"
       self.label_photo_status.visible = True
     else:
@@ -69,6 +100,7 @@ class row_questions(row_questionsTemplate):
         - pass_fail: 'Pass', 'Fail', 'NA', or None
         - notes: Text notes (only if Fail)
         - photo: Uploaded photo file (if any)
+        - measured_value: Actual measurement (None if not measured)
     """
     pass_fail = None
 
@@ -79,17 +111,23 @@ class row_questions(row_questionsTemplate):
     elif self.radio_button_na.selected:
       pass_fail = 'NA'
 
-    # Get the current file from the uploader OR use the stored photo
-    current_file = self.image_fl.file if self.image_fl.file else self.stored_photo
+    current_file = self.stored_photo
 
     # Include the photo in the result
     return {
       'question_id': self.item['question_id'],
       'pass_fail': pass_fail,
       'notes': self.text_area_notes.text if pass_fail == 'Fail' else '',
-      'photo': current_file
+      'photo': current_file,
+      'measured_value': self.text_box_measured.text if self.text_box_measured.visible else None
     }
 
+  def text_box_measured_change(self, **event_args):
+    """Highlight a measurement outside the specification limits"""
+    value = self.text_box_measured.text
+    out_of_spec = value is not None and not (self.lsl <= value <= self.usl)
+    self.text_box_measured.foreground = 'red' if out_of_spec else None
+
   def radio_button_pass_clicked(self, **event_args):
     """Handle Pass selection - hide notes area"""
     self.text_area_notes.visible = False
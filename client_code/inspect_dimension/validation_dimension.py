@@ -2,207 +2,103 @@ import anvil.server
 # Client Code → Modules → validation_dimension.py
 #
 # Validation helpers for inspect_dimension navigation.
-# Ensures each row_questions item form has at least one RadioButton selected.
 # This follows the same pattern as validation_visual but for dimension checks.
+# Works on the answers stored in dimension_form.sample_results, checked against the
+# question list through the running counts in dimension_form.answer_counts (see
+# answer_counts), so every sample can be checked without rendering it. The
+# rows on screen are only used to bring an unanswered question into view.
+# Gaps only warn: complete answers are required when the inspection is
+# completed, not on each save.
 
-from anvil import alert, RadioButton
+from anvil import alert, Notification
 
 # ---- Public API --------------------------------------------------------------
 
 def validate_before_nav(dimension_form) -> bool:
   """
-  Validate all row_questions in the dimension_form's repeating panel(s) before moving
-  to another sample. Returns True if OK, False if blocked.
+  Point out unanswered questions of the current sample before moving to
+  another sample. Returns True: gaps never block navigation.
   
+  Inspectors may split the samples between them, so answers only have to be
+  complete when the inspection is completed (complete_inspection checks every
+  required question on the server). Optional questions are not reported.
+  
+  Reads the stored answers, so save the sample first.
   Expected usage in inspect_dimension:
+    self.save_current_sample()
     if not validation_dimension.validate_before_nav(self):
         return  # block navigation
     # ... proceed to previous/next sample
   """
-  row_forms = _collect_row_forms(dimension_form)
-  for row_form in row_forms:
-    if not _validate_row_form(row_form):
-      _focus_row(row_form)
-      return False
+  _clear_invalid(dimension_form)
+
+  sample_key = f"sample_{dimension_form.current_sample}"
+  missing = dimension_form.answer_counts['by_sample'].get(sample_key)
+  if missing:
+    Notification(f"Sample {dimension_form.current_sample}: {len(missing)} questions not answered yet "
+                 f"({', '.join(missing[:5])}{', ...' if len(missing) > 5 else ''})",
+                 style="warning").show()
   return True
 
 
 def validate_before_complete(dimension_form) -> bool:
   """
-  Validate the entire dimension inspection before completing or navigating away.
+  Check the dimension check answers before saving them or navigating away.
   
   This method:
-  1. Validates the current sample (to save any unsaved data)
-  2. Checks that all samples have been inspected
-  3. Verifies that all questions in all samples have been answered
+  1. Blocks if no required question has been answered at all
+  2. Warns (without blocking) about answers still missing in any sample,
+     using the running answer counts (no sample needs to be displayed)
+  
+  Partial answers are saved so the samples can be split between inspectors;
+  they must be complete when the inspection is completed.
   
   Args:
-      dimension_form: The inspect_dimension form instance
+      dimension_form: The inspect_dimension form instance (current sample already saved)
   
   Returns:
-      True if all validation passes
-      False if validation fails (shows alerts to user)
+      True if the answers can be saved
+      False if there is nothing to save (shows an alert to the user)
   """
-  # First validate the current sample display
-  if not validate_before_nav(dimension_form):
-    return False
+  counts = dimension_form.answer_counts
 
   # Check if we have any results saved
-  if not dimension_form.sample_results:
-    alert("No dimension check results found. Please complete at least one sample.")
+  if not dimension_form.sample_results or (counts['unanswered'] and not counts['answered']):
+    alert("No dimension check results found. Please answer at least one question.")
     return False
 
-  # Check that all samples have been inspected
-  expected_samples = dimension_form.sample_size
-  actual_samples = len(dimension_form.sample_results)
-
-  if actual_samples < expected_samples:
-    alert(f"Only {actual_samples} of {expected_samples} samples have been checked. "
-          f"Please complete all samples before navigating away.")
-    return False
+  if counts['unanswered']:
+    incomplete = sum(1 for gaps in counts['by_sample'].values() if gaps)
+    Notification(f"{counts['unanswered']} answers are still missing in {incomplete} of "
+                 f"{dimension_form.sample_size} samples. They must be answered before the inspection "
+                 "is completed.", style="warning", timeout=6).show()
+    current = counts['by_sample'].get(f"sample_{dimension_form.current_sample}")
+    if current:
+      _highlight_row(dimension_form, current[0])
 
-  # All validation passed
   return True
 
 
 
 # ---- Internals ---------------------------------------------------------------
 
-def _collect_row_forms(dimension_form):
-  """
-  Tries to find row item-forms in one or more repeating panels on the page.
-  It supports:
-    - dimension_form.repeating_panel_questions (preferred)
-    - dimension_form.rp_questions
-    - any RepeatingPanel attached to the form
-  """
-  panels = []
-  # Preferred names (don't rename your components; we just try them safely)
-  for name in ("repeating_panel_questions", "rp_questions"):
-    rp = getattr(dimension_form, name, None)
-    if rp is not None:
-      panels.append(rp)
-
-  # Fallback: scan for repeating panels on the form
-  if not panels:
-    panels = [c for c in _iter_components(dimension_form)
-              if c.__class__.__name__ == "RepeatingPanel"]
-
-  row_forms = []
-  for rp in panels:
-    try:
-      row_forms.extend(rp.get_components())
-    except Exception:
-      # If rp.get_components() isn't available (older anvil runtime), skip
-      pass
-  return row_forms
-
-
-def _validate_row_form(row_form) -> bool:
-  """
-  A row_questions item-form is valid iff each required radio group
-  has a selected option. By default we validate ALL radio groups found.
-  
-  To skip validation for a group:
-    - set 'skip_validate = True' on those RadioButtons, OR
-    - place the radios in a container with tag={'skip_validate': True}.
-  """
-  radios = [c for c in _iter_components(row_form)
-            if isinstance(c, RadioButton) and c.visible]
-
-  if not radios:
-    # Nothing to validate on this row
-    return True
-
-  # Group radios by group_name (ungrouped radios are treated as their own group)
-  groups = {}
-  for rb in radios:
-    if _component_or_ancestors_skipped(rb):
-      # Entire container (or the rb itself) flagged as skip
-      continue
-    gname = rb.group_name or f"__ungrouped__{id(rb)}"
-    groups.setdefault(gname, []).append(rb)
-
-  # Remove empty or skipped groups
-  groups = {g: lst for g, lst in groups.items() if lst}
-
-  # If the row form defines 'required_groups' (list of group names), validate only those.
-  required_groups = getattr(row_form, "required_groups", None)
-  if isinstance(required_groups, (list, tuple)) and required_groups:
-    targets = {g: groups.get(g, []) for g in required_groups}
-  else:
-    targets = groups  # validate all discovered groups
-
-  for gname, rblist in targets.items():
-    # If the group is empty or entirely skipped, ignore.
-    if not rblist:
-      continue
-    if not any(rb.selected for rb in rblist):
-      # Try to build a friendly message
-      qtext = _question_text_from_row(row_form) or "Please complete all dimension check questions."
-      alert(qtext)
+def _highlight_row(dimension_form, question_id):
+  """Scroll the current sample's row for a question into view and mark it."""
+  for row_form in dimension_form.repeating_panel_questions.get_components():
+    if row_form.item['question_id'] == question_id:
+      _focus_row(row_form)
       _mark_invalid(row_form)
-      return False
-
-  _clear_invalid(row_form)
-  return True
-
-
-def _component_or_ancestors_skipped(cmpnt):
-  # Check component flag
-  if getattr(cmpnt, "skip_validate", False):
-    return True
-  # Check container tags up the tree
-  p = getattr(cmpnt, "parent", None)
-  while p is not None:
-    t = getattr(p, "tag", None)
-    if isinstance(t, dict) and t.get("skip_validate"):
-      return True
-    p = getattr(p, "parent", None)
-  return False
-
-
-def _question_text_from_row(row_form):
-  """
-  Best-effort to fetch the question text:
-    - row_form.label_question.text
-    - row_form.question_label.text
-    - row_form.lbl_prompt.text
-    - row_form.item.get('question_text') / attribute 'question_text'
-  """
-  # Try common label names for dimension checks
-  for name in ("label_question", "question_label", "lbl_prompt"):
-    lbl = getattr(row_form, name, None)
-    if hasattr(lbl, "text") and lbl.text:
-      return f"Select an answer for: {lbl.text}"
-
-  # From bound item
-  item = getattr(row_form, "item", None)
-  if item is not None:
-    # dict-like or attribute-like
-    try:
-      val = item.get("question_text")
-    except Exception:
-      val = getattr(item, "question_text", None)
-    if val:
-      return f"Select an answer for: {val}"
-  return None
+    else:
+      _clear_row(row_form)
 
 
 def _focus_row(row_form):
   # Bring row into view if the platform supports it
   try:
     row_form.scroll_into_view()
+    row_form.radio_button_pass.focus()
   except Exception:
     pass
-  # Try to focus first radio in the row
-  for c in _iter_components(row_form):
-    if isinstance(c, RadioButton):
-      try:
-        c.focus()
-      except Exception:
-        pass
-      break
 
 
 def _mark_invalid(row_form):
@@ -213,7 +109,7 @@ def _mark_invalid(row_form):
     pass
 
 
-def _clear_invalid(row_form):
+def _clear_row(row_form):
   try:
     if getattr(row_form, "role", None) == "invalid":
       row_form.role = None
@@ -221,12 +117,6 @@ def _clear_invalid(row_form):
     pass
 
 
-def _iter_components(root):
-  # Depth-first traversal of component tree
-  yield root
-  getc = getattr(root, "get_components", None)
-  if callable(getc):
-    for child in getc():
-      for gc in _iter_components(child):
-        yield gc
-
+def _clear_invalid(dimension_form):
+  for row_form in dimension_form.repeating_panel_questions.get_components():
+    _clear_row(row_form)
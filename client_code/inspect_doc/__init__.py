@@ -5,6 +5,8 @@
 from ._anvil_designer import inspect_docTemplate
 from anvil import *
 import anvil.server
+import random
+import time
 import validation_doc  # Custom validation module for form validation
 
 class inspect_doc(inspect_docTemplate):
@@ -26,7 +28,9 @@ class inspect_doc(inspect_docTemplate):
     
     Args:
         inspection_id: Unique identifier for this inspection (e.g., 'INT-110')
-        properties: Additional properties (can also contain inspection_id)
+        properties: Additional properties (can also contain inspection_id, and
+                    questions/result_versions of a new inspection with nothing
+                    saved yet to skip those fetches)
     
     Note: Document check questions are universal (apply to all product series),
     so product_series is not needed.
@@ -36,6 +40,8 @@ class inspect_doc(inspect_docTemplate):
     # ===== INITIALIZATION SECTION =====
     # Store the inspection metadata - can come from parameter or properties
     self.inspection_id = inspection_id or properties.get('inspection_id')
+    self.preloaded_questions = properties.get('questions')  # From the header bootstrap, if any
+    self.preloaded_versions = properties.get('result_versions')  # From the header bootstrap, if any
 
     # Display ID in the form
     if self.inspection_id:
@@ -47,6 +53,9 @@ class inspect_doc(inspect_docTemplate):
     self.questions = []      # Will hold the list of questions from database
     self.question_results = {}  # Dictionary to store all document check results
     # Structure: {'Q001': {'pass_fail': 'Pass', 'note': '', 'photo_media': None}}
+    self.result_versions = {}  # Server version of each saved question, sent back on save
+    # Structure: {'Q001': 2}
+    self.pending_save = None  # (request_id, snapshot) of a save that got no reply yet
 
     # Load questions and set up the form
     self.setup_inspection()
@@ -63,13 +72,25 @@ class inspect_doc(inspect_docTemplate):
     """
     # ===== LOAD QUESTIONS FROM DATABASE =====
     # Server call to get all active document check questions
-    self.questions = anvil.server.call('get_document_questions')
+    # A new inspection gets its questions with the header save (see save_head)
+    if self.preloaded_questions is not None:
+      self.questions = self.preloaded_questions
+    else:
+      self.questions = anvil.server.call('get_document_questions')
 
     # Check if questions were found
     if not self.questions:
       alert(f"No document check questions found in the database.")
       return
 
+    # Start from the answers already saved (possibly by another inspector),
+    # with the version of each question, so the server can tell which of our
+    # answers are based on stale data. A new inspection has nothing saved yet.
+    if self.preloaded_versions is not None:
+      self.result_versions = self.preloaded_versions
+    else:
+      self.load_saved_results(anvil.server.call('get_document_results_for_inspection', self.inspection_id))
+
     # ===== INITIALIZE UI =====
     self.load_questions()  # Display questions
 
@@ -138,6 +159,9 @@ class inspect_doc(inspect_docTemplate):
         # Debug output
         print(f"  Q{result['question_id']}: {result['pass_fail']} - Note: {result.get('note', 'none')}")
 
+        # Remember which version of the question this answer was based on
+        result['version'] = self.result_versions.get(result['question_id'], 0)
+
         # Store result indexed by question_id
         self.question_results[result['question_id']] = result
 
@@ -150,7 +174,7 @@ class inspect_doc(inspect_docTemplate):
     
     This method:
     1. Collects all current answers from the form
-    2. Validates that all questions are answered
+    2. Checks that something was answered (gaps only give a warning)
     3. Calls server function to save results to database
     4. Displays success/failure message to user
     """
@@ -161,8 +185,9 @@ class inspect_doc(inspect_docTemplate):
     self.save_current_results()
 
     # ===== VALIDATION =====
-    # Call validation_doc module to ensure all required fields are filled
-    if not validation_doc.validate_doc(self.question_results):
+    # Call validation_doc module; unanswered questions only have to be filled
+    # in by the time the inspection is completed
+    if not validation_doc.validate_doc(self.question_results, self.questions):
       return
 
     # Check if we have results to save
@@ -189,14 +214,19 @@ class inspect_doc(inspect_docTemplate):
         'save_document_inspection_results',  # Server function name
         self.inspection_id,                  # Unique inspection ID
         self.question_results,               # All question data
-        inspector_name                       # Inspector who performed check
+        inspector_name,                      # Inspector who performed check
+        self.save_request_id()               # Reused if this save is retried
       )
 
       print(f"Server response: {result}")
 
+      # A reply arrived, so a later click is a new save rather than a retry
+      if not result.get('in_progress'):
+        self.pending_save = None
+
       # ===== HANDLE RESPONSE =====
       if result['success']:
-        alert(f"Document check saved: {result['message']}")
+        self.show_save_result("Document check saved", result)
         # TODO: Navigate back to main menu or next inspection step
       else:
         alert(f"Save failed: {result['message']}")
@@ -212,7 +242,7 @@ class inspect_doc(inspect_docTemplate):
     
     This method:
     1. Saves current results to memory (document_results)
-    2. Runs validation to ensure all questions are answered
+    2. Runs validation (at least one answer; gaps only give a warning)
     3. Saves to database if validation passes
     
     This button serves as the primary completion action for the document check.
@@ -235,13 +265,17 @@ class inspect_doc(inspect_docTemplate):
         'save_document_inspection_results',
         self.inspection_id,
         self.question_results,
-        inspector_name
+        inspector_name,
+        self.save_request_id()
       )
 
       print(f"Server response: {result}")
 
+      if not result.get('in_progress'):
+        self.pending_save = None
+
       if result['success']:
-        alert(f"Document check completed: {result['message']}")
+        self.show_save_result("Document check completed", result)
       else:
         alert(f"Save failed: {result['message']}")
 
@@ -249,6 +283,75 @@ class inspect_doc(inspect_docTemplate):
       print(f"ERROR calling server: {str(e)}")
       alert(f"Error saving to database: {str(e)}")
 
+  def save_request_id(self):
+    """
+    Get the request ID to send with a save of question_results.
+    
+    The ID is reused while the answers are unchanged, so clicking Save again
+    after a timeout returns the outcome of the save that already landed.
+    """
+    snapshot = repr(self.question_results)
+    if self.pending_save is None or self.pending_save[1] != snapshot:
+      request_id = f"{self.inspection_id}-document-{int(time.time() * 1000)}-{random.randint(0, 999999)}"
+      self.pending_save = (request_id, snapshot)
+    return self.pending_save[0]
+
+  def show_save_result(self, title, result):
+    """
+    Merge the server's answer to a save back into local state and report it.
+    
+    New versions are recorded for every question that was written. Questions
+    another inspector changed since we loaded them are not overwritten by the
+    server; they are replaced here with the stored answer (photo included) and
+    listed to the user.
+    """
+    self.result_versions.update(result.get('versions', {}))
+
+    conflicts = result.get('conflicts', [])
+    for cell in conflicts:
+      self.set_server_result(cell['question_id'], cell['server'])
+
+    if not conflicts:
+      alert(f"{title}: {result['message']}")
+      return
+
+    self.load_questions()
+    details = "\n".join(
+      f"• {c['question_id']}: {c['server']['pass_fail']} (by {c['server']['inspected_by']})"
+      for c in conflicts
+    )
+    alert(f"{title}: {result['message']}\n\n"
+          f"These answers were changed by another inspector and were not overwritten:\n{details}\n\n"
+          "Their answers are now shown. Review them and save again if needed.")
+
+  def load_saved_results(self, saved):
+    """
+    Take the answers already saved on the server as the starting point.
+    
+    Args:
+        saved: Results by question, as returned by get_document_results_for_inspection
+    """
+    self.question_results = {}
+    self.result_versions = {}
+    for question_id, stored in saved.items():
+      self.set_server_result(question_id, stored)
+
+  def set_server_result(self, question_id, stored):
+    """
+    Replace one question's answer with the one stored on the server.
+    
+    The whole answer is replaced, photo included, so a later save cannot
+    combine our photo with another inspector's answer.
+    """
+    self.question_results[question_id] = {
+      'question_id': question_id,
+      'pass_fail': stored['pass_fail'],
+      'note': stored['note'] or '',
+      'photo_media': stored['photo_media'],
+      'version': stored['version']
+    }
+    self.result_versions[question_id] = stored['version']
+
   def validate_before_navigation(self):
     """
     Validate the form before navigating away.
@@ -3,6 +3,7 @@
 from ._anvil_designer import row_questionsTemplate
 from anvil import *
 import anvil.server
+from ... import photo_resize
 
 class row_questions(row_questionsTemplate):
   """
@@ -104,8 +105,8 @@ class row_questions(row_questionsTemplate):
         file: The uploaded file object or None if cleared
     """
     if file:
-      # Store the new photo
-      self.stored_photo = file
+      # Store the new photo, downscaled for upload (see photo_resize)
+      self.stored_photo = photo_resize.downscale(file)
       self.label_photo_status.text = "Photo"
       self.label_photo_status.visible = True
     else:
@@ -133,8 +134,7 @@ class row_questions(row_questionsTemplate):
     elif self.radio_button_na.selected:
       pass_fail = 'NA'
 
-    # Get the current file from the uploader OR use the stored photo
-    current_file = self.image_fl.file if self.image_fl.file else self.stored_photo
+    current_file = self.stored_photo
 
     # Get note text (handle different component names)
     note_text = ''
@@ -2,55 +2,65 @@ import anvil.server
 import anvil.tables as tables
 import anvil.tables.query as q
 from anvil.tables import app_tables
-from anvil import alert
+from anvil import alert, Notification
 
 # Client Code → inspect_doc → validation_doc.py
 # Validation helpers for the Documentation Check form.
 
-def validate_doc(question_results: dict) -> bool:
+def validate_doc(question_results: dict, questions=None) -> bool:
   """
   Validate document check step before save.
-  Ensures all questions have been answered (not 'Not Answered' or None).
+  Requires at least one answer; unanswered questions only give a warning,
+  since every required question is checked when the inspection is completed.
   
   Args:
       question_results: Dictionary of question results
                        Format: {'Q001': {'pass_fail': 'Pass', 'note': '', 'photo_media': None}, ...}
+      questions: Optional question list; when given, every question on it that
+                 is not optional is checked (not only the ones present)
   
   Returns:
-      True if valid (all questions answered), otherwise False (after showing alerts).
+      True if the results can be saved, otherwise False (after showing an alert).
   """
 
-  # Check if we have any results
-  if not question_results:
-    alert("No questions have been answered. Please complete the document check.")
-    return False
-
-  # Track unanswered questions
+  # Track answered and unanswered questions
+  answered_questions = []
   unanswered_questions = []
 
-  # Check each question to ensure it has been answered
+  # Check each question to see if it has been answered
+  if questions is not None:
+    question_ids = [question['question_id'] for question in questions if not question.get('optional')]
+  else:
+    question_ids = list(question_results)
+
   for question_id, result in question_results.items():
-    pass_fail = result.get('pass_fail')
+    if _is_answered(result.get('pass_fail')):
+      answered_questions.append(question_id)
 
-    # Check if the question has been answered
-    # Valid answers: 'Pass', 'Fail', 'NA', 'ACCEPT', 'REJECT', 'NOT APPLICABLE'
-    # Invalid: None, '', 'Not Answered'
-    if pass_fail is None or pass_fail == '' or pass_fail == 'Not Answered':
+  for question_id in question_ids:
+    if not _is_answered(question_results.get(question_id, {}).get('pass_fail')):
       unanswered_questions.append(question_id)
 
-  # If there are unanswered questions, show an alert
-  if unanswered_questions:
-    if len(unanswered_questions) == 1:
-      alert(f"Question {unanswered_questions[0]} has not been answered. Please complete all questions before saving.")
-    else:
-      question_list = ', '.join(unanswered_questions)
-      alert(f"The following questions have not been answered: {question_list}. Please complete all questions before saving.")
+  # Nothing to save at all
+  if not answered_questions:
+    alert("No questions have been answered. Please complete the document check.")
     return False
 
-  # All questions have been answered
+  # Gaps are saved, but must be filled before the inspection is completed
+  if unanswered_questions:
+    question_list = ', '.join(unanswered_questions)
+    Notification(f"Not answered yet: {question_list}. These must be answered before the "
+                 "inspection is completed.", style="warning", timeout=6).show()
+
   return True
 
 
+def _is_answered(pass_fail) -> bool:
+  # Valid answers: 'Pass', 'Fail', 'NA', 'ACCEPT', 'REJECT', 'NOT APPLICABLE'
+  # Invalid: None, '', 'Not Answered'
+  return pass_fail not in (None, '', 'Not Answered')
+
+
 def validate_before_complete(form_instance) -> bool:
   """
   Validate document check before completing the inspection.
@@ -60,10 +70,10 @@ def validate_before_complete(form_instance) -> bool:
       form_instance: The inspect_doc form instance
   
   Returns:
-      True if all questions are answered, False otherwise
+      True if the results can be saved, False otherwise
   """
   # Save current state from the UI
   form_instance.save_current_results()
 
   # Validate the results
-  return validate_doc(form_instance.question_results)
\ No newline at end of file
+  return validate_doc(form_instance.question_results, form_instance.questions)
\ No newline at end of file
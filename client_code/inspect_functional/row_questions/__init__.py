@@ -3,6 +3,7 @@
 from ._anvil_designer import row_questionsTemplate
 from anvil import *
 import anvil.server
+from ... import photo_resize
 
 class row_questions(row_questionsTemplate):
   """
@@ -29,10 +30,24 @@ class row_questions(row_questionsTemplate):
                 - notes: Previously entered notes (if any)
                 - photo: Previously uploaded photo (if any)
         """
-    self.init_components(**properties)  
+    self.init_components(**properties)
+    self.bind_item(self.item)
+
+  def bind_item(self, item):
+    """
+        Show a question/sample in this row, replacing whatever it showed before.
+        
+        Called on creation, and by the parent form to reuse the row for
+        another sample instead of recreating it.
+        
+        Args:
+            item: Same dict as the 'item' property
+        """
+    self.item = item
 
     # Store the photo reference separately to prevent loss during navigation
     self.stored_photo = None
+    self.image_fl.clear()
 
     # ===== DISPLAY QUESTION =====
     # Format: "Q001. Screen Present & Seated?"
@@ -45,6 +60,9 @@ class row_questions(row_questionsTemplate):
     self.radio_button_pass.group_name = group_name
     self.radio_button_fail.group_name = group_name
     self.radio_button_na.group_name = group_name
+    self.radio_button_pass.selected = False
+    self.radio_button_fail.selected = False
+    self.radio_button_na.selected = False
 
     # ===== INITIALIZE NOTES =====
     # Restore any previously entered notes
@@ -82,8 +100,8 @@ class row_questions(row_questionsTemplate):
             file: The uploaded file object or None if cleared
         """
     if file:
-      # Store the new photo
-      self.stored_photo = file
+      # Store the new photo, downscaled for upload (see photo_resize)
+      self.stored_photo = photo_resize.downscale(file)
       self.label_photo_status.text = "Photo"
       self.label_photo_status.visible = True
     else:
@@ -111,9 +129,7 @@ class row_questions(row_questionsTemplate):
     elif self.radio_button_na.selected:
       pass_fail = 'NA'
 
-    # Get the current file from the uploader OR use the stored photo
-    # This ensures photos aren't lost when navigating between samples
-    current_file = self.image_fl.file if self.image_fl.file else self.stored_photo
+    current_file = self.stored_photo
 
     # Return the complete result
     # Notes are only included if Fail was selected
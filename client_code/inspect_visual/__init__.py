@@ -5,7 +5,11 @@
 from ._anvil_designer import inspect_visualTemplate
 from anvil import *
 import anvil.server
+import random
+import time
 import validation_visual  # Custom validation module for form validation
+from ..sample_grid import sample_grid
+from .. import answer_counts
 
 class inspect_visual(inspect_visualTemplate):
   """
@@ -27,6 +31,9 @@ class inspect_visual(inspect_visualTemplate):
                 - inspection_id: Unique identifier for this inspection (e.g., 'INT-110')
                 - product_series: Product series being inspected
                 - sample_size: Number of samples to inspect
+                - questions: Optional question list (skips the question fetch)
+                - result_versions: Optional cell versions of a new inspection with
+                  nothing saved yet (skips the fetch of saved results)
         """
     self.init_components(**properties)
 
@@ -36,12 +43,19 @@ class inspect_visual(inspect_visualTemplate):
     self.id_head_box.text = self.inspection_id          # Display ID in the form
     self.product_series = properties.get('product_series')  # Product type
     self.sample_size = int(properties.get('sample_size', 1))  # Default to 1 sample
+    self.preloaded_questions = properties.get('questions')  # From the header bootstrap, if any
+    self.preloaded_versions = properties.get('result_versions')  # From the header bootstrap, if any
 
     # ===== STATE MANAGEMENT =====
     self.current_sample = 1  # Start with first sample
     self.questions = []      # Will hold the list of questions from database
     self.sample_results = {}  # Dictionary to store all inspection results
     # Structure: {'sample_1': {'Q001': {'pass_fail': 'Pass', 'notes': '', 'photo': None}}}
+    self.result_versions = {}  # Server version of each saved cell, sent back on save
+    # Structure: {'sample_1': {'Q001': 2}}
+    self.pending_save = None  # (request_id, snapshot) of a save that got no reply yet
+    self.answer_counts = None  # Answered/unanswered totals per sample, see answer_counts
+    self.reuse_rows = True  # Rebind the existing question rows on sample change instead of recreating them
 
     # Load questions and set up the form
     self.setup_inspection()
@@ -57,13 +71,29 @@ class inspect_visual(inspect_visualTemplate):
         """
     # ===== LOAD QUESTIONS FROM DATABASE =====
     # Server call to get all active visual inspection questions for this product series
-    self.questions = anvil.server.call('get_visual_questions', self.product_series)
+    # A new inspection gets its questions with the header save (see save_head)
+    if self.preloaded_questions is not None:
+      self.questions = self.preloaded_questions
+    else:
+      self.questions = anvil.server.call('get_visual_questions', self.product_series)
 
     # Check if questions were found
     if not self.questions:
+      self.answer_counts = answer_counts.recount([], self.sample_results, self.sample_size)
       alert(f"No visual inspection questions found for series: {self.product_series}")
       return
 
+    # Start from the answers already saved (possibly by another inspector),
+    # with the version of each cell, so the server can tell which of our
+    # answers are based on stale data. A new inspection has nothing saved yet.
+    if self.preloaded_versions is not None:
+      self.result_versions = self.preloaded_versions
+    else:
+      self.load_saved_results(anvil.server.call('get_visual_results_for_inspection', self.inspection_id))
+
+    # Kept up to date as samples are stored
+    self.answer_counts = answer_counts.recount(self.questions, self.sample_results, self.sample_size)
+
       # ===== INITIALIZE UI =====
     self.update_sample_counter()     # Show "Sample 1 of X"
     self.load_questions_for_sample() # Display questions for sample 1
@@ -79,6 +109,9 @@ class inspect_visual(inspect_visualTemplate):
         """
     # ===== UPDATE SAMPLE COUNTER DISPLAY =====
     self.label_sample_counter.text = f"Sample {self.current_sample} of {self.sample_size}"
+    if self.answer_counts and self.questions:
+      total = answer_counts.required_count(self.questions) * self.sample_size
+      self.label_sample_counter.text += f" ({self.answer_counts['answered']}/{total} answered)"
 
     # ===== CONFIGURE NAVIGATION BUTTONS =====
     # Disable Previous button on first sample
@@ -126,9 +159,15 @@ class inspect_visual(inspect_visualTemplate):
       }
       question_items.append(item)
 
-      # ===== UPDATE UI =====
-      # Setting items triggers the repeating panel to create row_questions forms
-    self.repeating_panel_questions.items = question_items
+    # ===== UPDATE UI =====
+    # Rows already showing these questions are rebound in place (no new components);
+    # otherwise setting items triggers the repeating panel to create row_questions forms
+    rows = self.repeating_panel_questions.get_components()
+    if self.reuse_rows and [row.item['question_id'] for row in rows] == [item['question_id'] for item in question_items]:
+      for row, item in zip(rows, question_items):
+        row.bind_item(item)
+    else:
+      self.repeating_panel_questions.items = question_items
 
   def save_current_sample(self):
     """
@@ -164,9 +203,15 @@ class inspect_visual(inspect_visualTemplate):
         # Debug output
         print(f"  Q{result['question_id']}: {result['pass_fail']} - Notes: {result.get('notes', 'none')}")
 
+        # Remember which version of the cell this answer was based on
+        result['version'] = self.result_versions.get(sample_key, {}).get(result['question_id'], 0)
+
         # Store result indexed by question_id
         self.sample_results[sample_key][result['question_id']] = result
 
+    # Keep the answered/unanswered totals in step with the stored answers
+    answer_counts.update_sample(self.answer_counts, self.questions, sample_key, self.sample_results[sample_key])
+
         # ===== SUMMARY OUTPUT =====
     print(f"Total saved for this sample: {len(self.sample_results[sample_key])} questions")
     print(f"All samples so far: {self.sample_results.keys()}")
@@ -176,19 +221,20 @@ class inspect_visual(inspect_visualTemplate):
         Handle Previous button click - navigate to previous sample.
         
         This method:
-        1. Validates that all questions are answered
-        2. Saves the current sample's data
+        1. Saves the current sample's data
+        2. Points out unanswered questions (gaps do not block)
         3. Decrements the sample counter
         4. Loads questions for the previous sample
         """
+    # ===== SAVE CURRENT STATE =====
+    self.save_current_sample()
+
     # ===== VALIDATION CHECK =====
-    # Ensure all questions are answered before allowing navigation
+    # Point out unanswered questions; they only have to be answered when the
+    # inspection is completed, so samples can be split between inspectors
     if not validation_visual.validate_before_nav(self):
       return  # Validation failed - stay on current sample
 
-      # ===== SAVE CURRENT STATE =====
-    self.save_current_sample()
-
     # ===== NAVIGATE TO PREVIOUS SAMPLE =====
     if self.current_sample > 1:
       self.current_sample -= 1
@@ -203,16 +249,16 @@ class inspect_visual(inspect_visualTemplate):
         - Navigates to the next sample (if not on last sample)
         - Completes the inspection (if on last sample)
         """
-    # ===== VALIDATION CHECK =====
-    # Ensure all questions are answered before proceeding
-    if not validation_visual.validate_before_nav(self):
-      return  # Validation failed - stay on current sample
-
     print(f"=== NEXT BUTTON CLICKED - Sample {self.current_sample} of {self.sample_size} ===")
 
     # ===== SAVE CURRENT STATE =====
     self.save_current_sample()
 
+    # ===== VALIDATION CHECK =====
+    # Point out unanswered questions (see button_previous_click)
+    if not validation_visual.validate_before_nav(self):
+      return  # Validation failed - stay on current sample
+
     # ===== DETERMINE ACTION =====
     if self.current_sample < self.sample_size:
       # Not the last sample - move to next
@@ -221,6 +267,9 @@ class inspect_visual(inspect_visualTemplate):
       self.load_questions_for_sample() # Load next sample's questions
     else:
       # This is the last sample - complete the inspection
+      # Warns about gaps left in any sample; only an empty section is refused
+      if not validation_visual.validate_before_complete(self):
+        return
       print("=== LAST SAMPLE - CALLING COMPLETE INSPECTION ===")
       self.complete_inspection()
 
@@ -266,18 +315,35 @@ class inspect_visual(inspect_visualTemplate):
     # ===== SAVE TO DATABASE =====
     try:
       # Call server function to save all results
+      request_id = self.save_request_id()
       result = anvil.server.call(
         'save_visual_inspection_results',  # Server function name
         self.inspection_id,                 # Unique inspection ID
         self.sample_results,                # All sample data
-        inspector_name                      # Inspector who performed inspection
+        inspector_name,                     # Inspector who performed inspection
+        request_id                          # Reused if this save is retried
       )
 
       print(f"Server response: {result}")
 
+      # A reply arrived, so a later click is a new save rather than a retry
+      if not result.get('in_progress'):
+        self.pending_save = None
+
       # ===== HANDLE RESPONSE =====
       if result['success']:
-        alert(f"Inspection saved: {result['message']}")
+        conflicts = self.apply_save_result(result)
+        if conflicts:
+          details = "\n".join(
+            f"• {c['sample'].replace('_', ' ').title()} {c['question_id']}: "
+            f"{c['server']['pass_fail']} (by {c['server']['inspected_by']})"
+            for c in conflicts
+          )
+          alert(f"Inspection saved: {result['message']}\n\n"
+                f"These answers were changed by another inspector and were not overwritten:\n{details}\n\n"
+                "Their answers are now shown. Review them and save again if needed.")
+        else:
+          alert(f"Inspection saved: {result['message']}")
         # TODO: Navigate back to main menu or next inspection step
       else:
         alert(f"Save failed: {result['message']}")
@@ -287,6 +353,109 @@ class inspect_visual(inspect_visualTemplate):
       print(f"ERROR calling server: {str(e)}")
       alert(f"Error: {str(e)}")
 
+  def save_request_id(self):
+    """
+        Get the request ID to send with a save of sample_results.
+        
+        A save that timed out may still have landed on the server, so the same ID
+        is reused while the results are unchanged. The server then answers a
+        retried click from its record of the first call instead of saving again.
+        
+        Returns:
+            Request ID string
+        """
+    snapshot = repr(self.sample_results)
+    if self.pending_save is None or self.pending_save[1] != snapshot:
+      request_id = f"{self.inspection_id}-visual-{int(time.time() * 1000)}-{random.randint(0, 999999)}"
+      self.pending_save = (request_id, snapshot)
+    return self.pending_save[0]
+
+  def apply_save_result(self, result):
+    """
+        Merge the server's answer to a save back into local state.
+        
+        This method:
+        1. Records the new version of every cell that was written
+        2. Replaces each conflicting cell with the answer stored on the server,
+           photo included
+        3. Redisplays the current sample if any of its cells changed
+        
+        Returns:
+            List of conflicting cells reported by the server
+        """
+    for sample_key, versions in result.get('versions', {}).items():
+      self.result_versions.setdefault(sample_key, {}).update(versions)
+
+    conflicts = result.get('conflicts', [])
+    for cell in conflicts:
+      self.set_server_cell(cell['sample'], cell['question_id'], cell['server'])
+
+    for sample_key in {c['sample'] for c in conflicts}:
+      answer_counts.update_sample(self.answer_counts, self.questions, sample_key, self.sample_results[sample_key])
+
+    if any(c['sample'] == f"sample_{self.current_sample}" for c in conflicts):
+      self.load_questions_for_sample()
+
+    return conflicts
+
+  def load_saved_results(self, saved):
+    """
+        Take the answers already saved on the server as the starting point.
+        
+        Args:
+            saved: Results by sample and question, as returned by
+                   get_visual_results_for_inspection
+        """
+    self.sample_results = {}
+    self.result_versions = {}
+    for sample_key, answers in saved.items():
+      for question_id, stored in answers.items():
+        self.set_server_cell(sample_key, question_id, stored)
+
+  def set_server_cell(self, sample_key, question_id, stored):
+    """
+        Replace one cell with the answer stored on the server.
+        
+        The whole cell is replaced, photo included, so a later save cannot
+        combine our photo with another inspector's answer.
+        """
+    self.sample_results.setdefault(sample_key, {})[question_id] = {
+      'question_id': question_id,
+      'pass_fail': stored['pass_fail'],
+      'notes': stored['notes'] or '',
+      'photo': stored['photo'],
+      'version': stored['version']
+    }
+    self.result_versions.setdefault(sample_key, {})[question_id] = stored['version']
+
+  def button_grid_click(self, **event_args):
+    """
+        Enter all samples at once in the sample × question grid.
+        
+        The grid works on a copy of sample_results; on Done its answers replace
+        them and the current sample is redisplayed. Notes and photos for
+        failures are still added on the per-sample page.
+        """
+    self.save_current_sample()
+
+    grid = sample_grid(
+      questions=self.questions,
+      sample_size=self.sample_size,
+      sample_results=self.sample_results,
+      result_versions=self.result_versions
+    )
+    if not alert(content=grid, title="Visual Check - All Samples", large=True,
+                 buttons=[("Done", True), ("Cancel", False)]):
+      return
+
+    self.sample_results = grid.get_results()
+    self.answer_counts = answer_counts.recount(self.questions, self.sample_results, self.sample_size)
+    self.update_sample_counter()
+    self.load_questions_for_sample()
+
+    if self.answer_counts['unanswered']:
+      Notification(f"{self.answer_counts['unanswered']} answers still missing", style="warning").show()
+
   def validate_before_navigation(self):
     """
     Validate the form before navigating away.
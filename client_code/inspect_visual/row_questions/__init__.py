@@ -2,13 +2,25 @@
 from ._anvil_designer import row_questionsTemplate
 from anvil import *
 import anvil.server
+from ... import photo_resize
 
 class row_questions(row_questionsTemplate):
   def __init__(self, **properties):
     self.init_components(**properties)
+    self.bind_item(self.item)
+
+  def bind_item(self, item):
+    """
+    Show a question/sample in this row, replacing whatever it showed before.
+    
+    Called on creation, and by the parent form to reuse the row for another
+    sample instead of recreating it.
+    """
+    self.item = item
 
     # Store the photo reference separately to prevent loss
     self.stored_photo = None
+    self.image_fl.clear()
 
     # Display the question
     self.label_question.text = f"{self.item['question_id']}. {self.item['question_text']}"
@@ -18,6 +30,9 @@ class row_questions(row_questionsTemplate):
     self.radio_button_pass.group_name = group_name
     self.radio_button_fail.group_name = group_name
     self.radio_button_na.group_name = group_name
+    self.radio_button_pass.selected = False
+    self.radio_button_fail.selected = False
+    self.radio_button_na.selected = False
 
     # Initialize notes visibility and content
     self.text_area_notes.text = self.item.get('notes', '')
@@ -31,7 +46,7 @@ class row_questions(row_questionsTemplate):
     else:
       self.label_photo_status.visible = False
 
-      # Restore previous selection if it exists
+    # Restore previous selection if it exists
     if self.item.get('pass_fail') == 'Pass':
       self.radio_button_pass.selected = True
       self.text_area_notes.visible = False
@@ -48,8 +63,8 @@ class row_questions(row_questionsTemplate):
   def image_fl_change(self, file, **event_args):
     """Handle file upload changes"""
     if file:
-      # Store the new photo
-      self.stored_photo = file
+      # Store the new photo, downscaled for upload (see photo_resize)
+      self.stored_photo = photo_resize.downscale(file)
       self.label_photo_status.text = "Photo"
       self.label_photo_status.visible = True
     else:
@@ -67,8 +82,7 @@ class row_questions(row_questionsTemplate):
     elif self.radio_button_na.selected:
       pass_fail = 'NA'
 
-      # Get the current file from the uploader OR use the stored photo
-    current_file = self.image_fl.file if self.image_fl.file else self.stored_photo
+    current_file = self.stored_photo
 
     # Include the photo in the result
     return {
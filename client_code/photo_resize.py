@@ -0,0 +1,91 @@
+# Client Code → Modules → photo_resize.py
+#
+# Shrinks inspection photos in the browser before they are attached to a
+# result, so a 4000px / 5 MB phone picture goes up as a ~1600px JPEG of a few
+# hundred KB.
+#
+# The photo is drawn onto a canvas (through anvil.js) at most MAX_DIMENSION
+# pixels on its longest side and re-encoded as JPEG at QUALITY. If the browser
+# cannot decode the image, anvil.image.generate_thumbnail is used instead
+# (same size limit, no quality setting). If both fail, or nothing would be
+# saved, the original file is kept.
+
+import anvil.image
+import anvil.js
+from anvil.js.window import document, createImageBitmap, fetch
+import anvil.media
+
+# Set to False to upload photos exactly as taken
+ENABLED = True
+
+# Longest side of an uploaded photo, in pixels
+MAX_DIMENSION = 1600
+
+# JPEG quality, 0-1 (0.8 keeps scratches and porosity visible)
+QUALITY = 0.8
+
+# Photos smaller than this are uploaded as they are
+MIN_BYTES = 300 * 1024
+
+
+def downscale(media, max_dimension=None, quality=None):
+  """
+  Resize and recompress a photo for upload.
+
+  The row forms keep the result as their stored_photo and send that, not the
+  raw FileLoader file, with their results; it also carries the photo across
+  sample navigation.
+
+  Args:
+      media: Media from a FileLoader
+      max_dimension: Longest side in pixels (default MAX_DIMENSION)
+      quality: JPEG quality 0-1 (default QUALITY)
+
+  Returns:
+      A smaller JPEG Media, or the original media if it is not an image,
+      is already small, or could not be resized
+  """
+  if not ENABLED or media is None or not (media.content_type or '').startswith('image/'):
+    return media
+
+  original_size = media.length
+  if original_size is not None and original_size < MIN_BYTES:
+    return media
+
+  max_dimension = max_dimension or MAX_DIMENSION
+  quality = quality or QUALITY
+
+  try:
+    resized = _canvas_resize(media, max_dimension, quality)
+  except Exception as e:
+    print(f"Canvas resize failed, using thumbnail: {str(e)}")
+    try:
+      resized = anvil.image.generate_thumbnail(media, max_dimension)
+    except Exception as e:
+      print(f"Could not resize photo: {str(e)}")
+      return media
+
+  if original_size is not None and resized.length >= original_size:
+    return media
+
+  print(f"Photo resized: {original_size} -> {resized.length} bytes")
+  return resized
+
+
+def _canvas_resize(media, max_dimension, quality):
+  """Draw the photo scaled onto a canvas and encode it as JPEG."""
+  with anvil.media.TempUrl(media) as url:
+    blob = fetch(url).blob()
+  # 'from-image' applies the EXIF rotation phones store instead of turning the pixels
+  bitmap = createImageBitmap(blob, {'imageOrientation': 'from-image'})
+
+  scale = min(1, max_dimension / max(bitmap.width, bitmap.height))
+  canvas = document.createElement('canvas')
+  canvas.width = max(1, round(bitmap.width * scale))
+  canvas.height = max(1, round(bitmap.height * scale))
+  canvas.getContext('2d').drawImage(bitmap, 0, 0, canvas.width, canvas.height)
+  bitmap.close()
+
+  jpeg = fetch(canvas.toDataURL('image/jpeg', quality)).blob()
+  name = (media.name or 'photo').rsplit('.', 1)[0] + '.jpg'
+  return anvil.js.to_media(jpeg, content_type='image/jpeg', name=name)
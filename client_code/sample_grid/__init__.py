@@ -0,0 +1,170 @@
+# sample_grid form - Sample × question grid entry
+# Shared by inspect_visual, inspect_dimension and inspect_functional to enter a
+# whole section at once: questions are rows, samples are columns.
+#
+# Only one page of SAMPLES_PER_PAGE sample columns is built. Paging rebinds the
+# same cells to the next samples, so the cost of the grid does not grow with
+# the sample size. Answers are kept in the same structure as the section
+# forms' sample_results:
+#   {'sample_1': {'Q001': {'question_id': 'Q001', 'pass_fail': 'Pass', 'notes': '', 'photo': None, 'version': 0}}}
+
+from ._anvil_designer import sample_gridTemplate
+from anvil import *
+
+# Sample columns shown at once (the question label takes the rest of the 12-column grid)
+SAMPLES_PER_PAGE = 8
+QUESTION_WIDTH = 12 - SAMPLES_PER_PAGE
+
+ANSWERS = [('Pass', 'Pass'), ('Fail', 'Fail'), ('NA', 'NA')]
+
+
+class sample_grid(sample_gridTemplate):
+  def __init__(self, **properties):
+    """
+        Build the grid for one section.
+
+        Args:
+            properties: Dictionary containing:
+                - questions: Question dicts ('question_id', 'question_text')
+                - sample_size: Number of samples to inspect
+                - sample_results: Answers entered so far (not modified; see get_results)
+                - result_versions: Server version of each saved cell
+        """
+    self.init_components(**properties)
+
+    self.questions = properties.get('questions') or []
+    self.sample_size = int(properties.get('sample_size', 1))
+    self.result_versions = properties.get('result_versions') or {}
+
+    # Work on copies so Cancel in the caller leaves its results untouched
+    self.results = {
+      sample_key: {qid: dict(result) for qid, result in answers.items()}
+      for sample_key, answers in (properties.get('sample_results') or {}).items()
+    }
+
+    self.first_sample = 1  # Sample shown in the first column
+    self.drop_down_copy_from.items = [(f"Sample {n}", n) for n in range(1, self.sample_size + 1)]
+
+    self.build_cells()
+    self.show_page()
+
+  # ===== GRID =====
+
+  def build_cells(self):
+    """Create the header and one row of answer cells per question (once)."""
+    self.header_labels = []
+    self.cells = []  # [question index][column] -> DropDown
+
+    self.grid_cells.add_component(Label(text="Question", bold=True), row='header', width_xs=QUESTION_WIDTH)
+    for col in range(SAMPLES_PER_PAGE):
+      label = Label(bold=True, align='center')
+      self.grid_cells.add_component(label, row='header', width_xs=1)
+      self.header_labels.append(label)
+
+    for index, question in enumerate(self.questions):
+      row_name = f"q_{question['question_id']}"
+      self.grid_cells.add_component(
+        Label(text=f"{question['question_id']}. {question['question_text']}"),
+        row=row_name, width_xs=QUESTION_WIDTH
+      )
+      row_cells = []
+      for col in range(SAMPLES_PER_PAGE):
+        cell = DropDown(items=ANSWERS, include_placeholder=True, placeholder='-')
+        cell.tag = (index, col)
+        cell.set_event_handler('change', self.cell_change)
+        self.grid_cells.add_component(cell, row=row_name, width_xs=1)
+        row_cells.append(cell)
+      self.cells.append(row_cells)
+
+  def show_page(self):
+    """Bind the existing cells to the samples of the current page."""
+    last_sample = min(self.first_sample + SAMPLES_PER_PAGE - 1, self.sample_size)
+    self.label_page.text = f"Samples {self.first_sample}-{last_sample} of {self.sample_size}"
+    self.button_page_prev.enabled = self.first_sample > 1
+    self.button_page_next.enabled = last_sample < self.sample_size
+
+    for col, label in enumerate(self.header_labels):
+      sample = self.first_sample + col
+      label.text = str(sample) if sample <= self.sample_size else ''
+
+    for index, question in enumerate(self.questions):
+      for col, cell in enumerate(self.cells[index]):
+        sample = self.first_sample + col
+        cell.visible = sample <= self.sample_size
+        cell.selected_value = self.answer(sample, question['question_id']) if cell.visible else None
+        cell.foreground = 'red' if cell.selected_value == 'Fail' else None
+
+  def cell_change(self, sender, **event_args):
+    """Record an answer as soon as a cell changes"""
+    index, col = sender.tag
+    self.set_answer(self.first_sample + col, self.questions[index]['question_id'], sender.selected_value)
+    sender.foreground = 'red' if sender.selected_value == 'Fail' else None
+
+  # ===== RESULTS =====
+
+  def answer(self, sample, question_id):
+    return self.results.get(f"sample_{sample}", {}).get(question_id, {}).get('pass_fail')
+
+  def set_answer(self, sample, question_id, pass_fail, notes=None):
+    """Set one cell, keeping any photo or measurement already entered for it."""
+    sample_key = f"sample_{sample}"
+    result = self.results.setdefault(sample_key, {}).setdefault(
+      question_id, {'question_id': question_id, 'notes': '', 'photo': None}
+    )
+    result['pass_fail'] = pass_fail
+    if notes is not None:
+      result['notes'] = notes
+    elif pass_fail != 'Fail':
+      # Same rule as the row forms: notes are only kept for failures
+      result['notes'] = ''
+    result['version'] = self.result_versions.get(sample_key, {}).get(question_id, 0)
+
+  def get_results(self):
+    """
+        Answers for every sample, in the section forms' sample_results structure.
+
+        Returns:
+            Dictionary keyed 'sample_N', then question_id
+        """
+    return self.results
+
+  # ===== TOOLBAR =====
+
+  def button_page_prev_click(self, **event_args):
+    """Show the previous page of samples"""
+    self.first_sample = max(1, self.first_sample - SAMPLES_PER_PAGE)
+    self.show_page()
+
+  def button_page_next_click(self, **event_args):
+    """Show the next page of samples"""
+    if self.first_sample + SAMPLES_PER_PAGE <= self.sample_size:
+      self.first_sample += SAMPLES_PER_PAGE
+      self.show_page()
+
+  def button_pass_all_click(self, **event_args):
+    """Set every unanswered cell, on every page, to Pass"""
+    for sample in range(1, self.sample_size + 1):
+      for question in self.questions:
+        if not self.answer(sample, question['question_id']):
+          self.set_answer(sample, question['question_id'], 'Pass')
+    self.show_page()
+
+  def button_copy_click(self, **event_args):
+    """Copy one sample's answers (and failure notes) to every other sample"""
+    source = self.drop_down_copy_from.selected_value
+    if not source:
+      alert("Select the sample to copy from.")
+      return
+    if not confirm(f"Copy the answers of sample {source} to all {self.sample_size} samples? "
+                   "Answers already entered for the other samples are replaced."):
+      return
+
+    source_answers = self.results.get(f"sample_{source}", {})
+    for sample in range(1, self.sample_size + 1):
+      if sample == source:
+        continue
+      for question in self.questions:
+        copied = source_answers.get(question['question_id'])
+        if copied and copied.get('pass_fail'):
+          self.set_answer(sample, question['question_id'], copied['pass_fail'], copied.get('notes', ''))
+    self.show_page()
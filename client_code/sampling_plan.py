@@ -0,0 +1,111 @@
+# Client Code → Modules → sampling_plan.py
+# ANSI/ASQ Z1.4-style single sampling plans (normal inspection), precomputed.
+#
+# Pure Python so it runs in the browser (auto-filling sam_qty as lot_qty is
+# typed) and on the server. Every (lot-size band, inspection level, AQL) plan
+# is worked out once at import; a lookup is a band search over 15 bounds and
+# one dict read - no table search.
+
+from bisect import bisect_left
+
+# Upper bound of each lot-size band (Z1.4 Table I); the last band is open-ended
+LOT_BANDS = [8, 15, 25, 50, 90, 150, 280, 500, 1200, 3200, 10000, 35000, 150000, 500000, None]
+
+# Sample size code letter per band for each inspection level (Z1.4 Table I)
+CODE_LETTERS = {
+  'S1':  'AAAABBBBCCCCDDD',
+  'S2':  'AAABBBCCCDDDEEE',
+  'S3':  'AABBCCDDEEFFGGH',
+  'S4':  'AABCCDEEFGGHJJK',
+  'I':   'AABCCDEFGHJKLMN',
+  'II':  'ABCDEFGHJKLMNPQ',
+  'III': 'BCDEFGHJKLMNPQR',
+}
+
+# Sample size for each code letter (Z1.4 Table II-A)
+CODE_SAMPLE_SIZE = {
+  'A': 2, 'B': 3, 'C': 5, 'D': 8, 'E': 13, 'F': 20, 'G': 32, 'H': 50,
+  'J': 80, 'K': 125, 'L': 200, 'M': 315, 'N': 500, 'P': 800, 'Q': 1250, 'R': 2000,
+}
+CODE_ORDER = 'ABCDEFGHJKLMNPQR'
+
+# AQL columns supported, in Z1.4 order
+AQLS = [0.65, 1.0, 1.5, 2.5, 4.0, 6.5]
+
+# Accept numbers along a Table II-A diagonal. The plan for a code letter and
+# AQL sits at diagonal position (letter index + AQL index - 5); 'up' and
+# 'down' are the table's arrows to the first plan above/below.
+DIAGONAL = [0, 'up', 'down', 1, 2, 3, 5, 7, 10, 14, 21]
+
+# Vendor tier -> AQL applied to its lots (tier 1 = most trusted vendor)
+TIER_AQL = {'1': 4.0, '2': 2.5, '3': 1.0}
+DEFAULT_TIER = '2'
+DEFAULT_LEVEL = 'II'
+
+
+def _resolve(letter_index, aql_index):
+  """Follow Table II-A arrows to the plan that applies. Returns (code letter, Ac)."""
+  while True:
+    position = letter_index + aql_index - 5
+    if position < 0 or (position < len(DIAGONAL) and DIAGONAL[position] == 'down'):
+      letter_index += 1
+    elif position >= len(DIAGONAL) or DIAGONAL[position] == 'up':
+      letter_index -= 1
+    else:
+      return CODE_ORDER[letter_index], DIAGONAL[position]
+
+
+def _build_plans():
+  plans = {}
+  for level, letters in CODE_LETTERS.items():
+    for band, letter in enumerate(letters):
+      for aql_index, aql in enumerate(AQLS):
+        code, accept = _resolve(CODE_ORDER.index(letter), aql_index)
+        plans[(band, level, aql)] = {
+          'code_letter': code,
+          'sample_size': CODE_SAMPLE_SIZE[code],
+          'accept': accept,
+          'reject': accept + 1
+        }
+  return plans
+
+
+PLANS = _build_plans()
+
+
+def lot_band(lot_qty):
+  """Index of the lot-size band containing lot_qty."""
+  return min(bisect_left(LOT_BANDS[:-1], lot_qty), len(LOT_BANDS) - 1)
+
+
+def get_plan(lot_qty, level=DEFAULT_LEVEL, tier=DEFAULT_TIER, aql=None):
+  """
+  Look up the sampling plan for a lot.
+
+  Args:
+      lot_qty: Lot size (2 or more)
+      level: Inspection level ('I', 'II', 'III' or 'S1'-'S4')
+      tier: Vendor tier, used to pick the AQL when aql is not given
+      aql: Optional AQL overriding the tier's
+
+  Returns:
+      dict: {'code_letter': str, 'sample_size': int, 'accept': int, 'reject': int,
+             'aql': float, 'level': str} or None when lot_qty is not a lot size.
+             sample_size never exceeds lot_qty (100% inspection for small lots).
+  """
+  try:
+    lot_qty = int(lot_qty)
+  except (TypeError, ValueError):
+    return None
+  if lot_qty < 2:
+    return None
+
+  if aql is None:
+    aql = TIER_AQL.get(str(tier or DEFAULT_TIER).strip(), TIER_AQL[DEFAULT_TIER])
+  plan = PLANS.get((lot_band(lot_qty), level, aql))
+  if plan is None:
+    return None
+
+  plan = dict(plan, aql=aql, level=level)
+  plan['sample_size'] = min(plan['sample_size'], lot_qty)
+  return plan
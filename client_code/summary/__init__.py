@@ -34,8 +34,7 @@ class summary(summaryTemplate):
         summary_data = anvil.server.call('get_inspection_summary', inspection_id)
       else:
         # Load most recent completed inspection
-        all_summaries = anvil.server.call('get_all_completed_inspections')
-        summary_data = all_summaries[0] if all_summaries else None
+        summary_data = anvil.server.call('get_latest_completed_inspection')
 
       if summary_data:
         # Populate form fields
@@ -97,15 +96,10 @@ class summary(summaryTemplate):
     self.box_total_reject.text = ''
 
   def btn_email_click(self, **event_args):
-    anvil.server.call("email_summary", 
-                     self.box_inspection_id.text, 
-                     self.box_complete_date.text,
-                     self.box_po_numb.text,
-                     self.box_rel_numb.text,
-                     self.box_series.text,
-                     self.box_prod_code.text,
-                     self.box_samp_qty.text,
-                     self.box_unit_reject.text,
-                     self.box_total_reject.text,
-                     self.box_to.text,
-                     self.txt_message.text)
\ No newline at end of file
+    # Sends the full report, reusing the cached copy when the results are unchanged.
+    # Only queues the message - rendering and delivery happen in the background
+    result = anvil.server.call("email_inspection_report",
+                               self.box_inspection_id.text,
+                               self.box_to.text,
+                               self.txt_message.text)
+    Notification(result['message'], style='success' if result['success'] else 'warning').show()
\ No newline at end of file
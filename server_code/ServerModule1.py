@@ -6,12 +6,46 @@ from anvil.tables import app_tables
 import anvil.email
 import anvil.server
 from datetime import datetime
+from .inspection_search import search_keys, duplicate_key
+from .summary_services import STATUS_COMPLETED
+from .id_sequences import next_inspection_id
+from .document_services import get_document_questions
+from .visual_services import get_visual_questions
+from .dimension_services import get_dimension_questions
+from .functional_services import get_functional_questions
+from . import sampling_plan
 
 # Code related to inspect_head form
 # Method to save inspect_head form data to inspect_head table
 @anvil.server.callable
-def save_head(ins_date, po_numb, rel_numb, series, prod_code, ord_qty, lot_qty, sam_qty, status):
-  row = app_tables.inspect_head.add_row(
+def save_head(ins_date, po_numb, rel_numb, series, prod_code, ord_qty, lot_qty, sam_qty, status,
+              bootstrap=False, allow_duplicate=False):
+  """
+  Create an inspection header.
+  
+  If an inspection of the same PO, release and product code is still open,
+  nothing is created and that inspection is returned so it can be resumed.
+  
+  Args:
+      bootstrap: Also return everything the section forms need to start, so
+                 beginning an inspection takes one round trip
+      allow_duplicate: Create the header even if an open one exists for the lot
+  
+  Returns:
+      str: The new id_head, or with bootstrap=True a dict from inspection_bootstrap,
+      or {'duplicate': True, 'id_head': str, 'header': dict} for an open duplicate
+  """
+  dup_key = duplicate_key(po_numb, rel_numb, prod_code)
+  if not allow_duplicate:
+    existing = find_open_inspection(dup_key)
+    if existing:
+      return duplicate_response(existing)
+
+  # Allocated from the inspection sequence - no counter scan, never shared
+  new_id = next_inspection_id()
+
+  existing = _add_head(allow_duplicate, dict(
+    id_head = new_id,
     ins_date = ins_date,
     po_numb = po_numb,
     rel_numb = rel_numb,
@@ -21,24 +55,77 @@ def save_head(ins_date, po_numb, rel_numb, series, prod_code, ord_qty, lot_qty,
     lot_qty = lot_qty,
     sam_qty = sam_qty,
     status = status,
-    update_dt = datetime.now()
-  )
-  # Compute a fallback value once
-  new_id = f"INS-{get_max_ord_qty()}"
-
-  # If id_head is missing (None or ""), assign it
-  if not row['id_head']:
-    row['id_head'] = new_id
+    update_dt = datetime.now(),
+    dup_key = dup_key,
+    **search_keys(po_numb, rel_numb, ins_date)
+  ))
+  if existing:
+    return duplicate_response(existing)
 
+  if bootstrap:
+    return inspection_bootstrap(new_id, series, lot_qty)
   return new_id
 
-# Not sure
-def get_max_ord_qty():
-  rows = app_tables.counter.search()
-  count_max = max((r['count'] for r in rows if r['count'] is not None), default=0)
-  row = app_tables.counter.get(count=count_max)
-  row['count'] = count_max + 1
-  return count_max
+
+@tables.in_transaction
+def _add_head(allow_duplicate, values):
+  """Insert a header unless an open duplicate appeared meanwhile (returned instead)."""
+  if not allow_duplicate:
+    existing = find_open_inspection(values['dup_key'])
+    if existing:
+      return existing
+  app_tables.inspect_head.add_row(**values)
+  return None
+
+
+def find_open_inspection(dup_key):
+  """First not-yet-completed header with this duplicate key, or None."""
+  for header in app_tables.inspect_head.search(dup_key=dup_key, status=q.not_(STATUS_COMPLETED)):
+    return header
+  return None
+
+
+def duplicate_response(header):
+  """Describe an open inspection of the same lot, for the client to offer resuming it."""
+  return {
+    'duplicate': True,
+    'id_head': header['id_head'],
+    'header': {
+      'ins_date': header['ins_date'],
+      'po_numb': header['po_numb'],
+      'rel_numb': header['rel_numb'],
+      'series': header['series'],
+      'prod_code': header['prod_code'],
+      'ord_qty': header['ord_qty'],
+      'lot_qty': header['lot_qty'],
+      'sam_qty': header['sam_qty'],
+      'status': header['status'],
+      'update_dt': header['update_dt']
+    }
+  }
+
+
+def inspection_bootstrap(id_head, series, lot_qty):
+  """
+  Everything the section forms of a new inspection load on open.
+  
+  Returns:
+      dict: {'id_head': str,
+             'sampling_plan': plan dict from sampling_plan.get_plan or None,
+             'questions': {'document': [...], 'visual': [...], 'dimension': [...], 'functional': [...]},
+             'result_versions': {'document': {}, ...} - empty, nothing is saved yet}
+  """
+  return {
+    'id_head': id_head,
+    'sampling_plan': sampling_plan.get_plan(lot_qty),
+    'questions': {
+      'document': get_document_questions(),
+      'visual': get_visual_questions(series),
+      'dimension': get_dimension_questions(series),
+      'functional': get_functional_questions(series)
+    },
+    'result_versions': {'document': {}, 'visual': {}, 'dimension': {}, 'functional': {}}
+  }
 
 # Method to update inspect_head form data to inspect_head table
 @anvil.server.callable
@@ -52,6 +139,8 @@ def update_head(id_head, po_numb, rel_numb, series, prod_code, ord_qty, lot_qty,
   row['lot_qty'] = lot_qty
   row['sam_qty'] = sam_qty
   row['update_dt'] = datetime.now()
+  row.update(**search_keys(po_numb, rel_numb, row['ins_date']),
+             dup_key=duplicate_key(po_numb, rel_numb, prod_code))
 
 
 # Determine if head_id exists in the inspect_doc table
@@ -0,0 +1,90 @@
+# Server Code → digest_services.py
+# Daily digest of completed inspections, one email per recipient list.
+#
+# Built from the day rows of quality_rollups (maintained by complete_inspection)
+# instead of reading every summary and its results. The only other read is one
+# search for the HOLD/REJECT inspections of the day, which are listed by ID.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import date, datetime, timedelta
+from .rollup_services import PERIOD_DAY, ROLLUP_COUNTERS, period_key
+from .email_services import queue_email, split_addresses
+
+
+def day_totals(rollups):
+  """Sum rollup rows into per-(series, prod_code) lines and an overall total."""
+  lines = {}
+  total = {c: 0 for c in ROLLUP_COUNTERS}
+  for row in rollups:
+    line = lines.setdefault((row['series'], row['prod_code']), {c: 0 for c in ROLLUP_COUNTERS})
+    for counter in ROLLUP_COUNTERS:
+      line[counter] += row[counter] or 0
+      total[counter] += row[counter] or 0
+  return lines, total
+
+
+def digest_text(day, lines, total, flagged):
+  """Plain-text body of a digest."""
+  text = [f"  Inspections completed {day.isoformat()}", ""]
+  text.append(f"  Inspections: {total['inspections']}  Samples: {total['samples']}  "
+              f"Unit Rejects: {total['unit_rejects']}  Total Rejects: {total['all_rejects']}")
+  text.append(f"  Accepted: {total['accept_count']}  On Hold: {total['hold_count']}  Rejected: {total['reject_count']}")
+  text.append("")
+  text.append("  By series / code:")
+  for (series, prod_code), line in sorted(lines.items()):
+    text.append(f"    {series} {prod_code}:  {line['inspections']} inspections, "
+                f"{line['unit_rejects']} unit rejects, {line['reject_count']} rejected, {line['hold_count']} on hold")
+  if flagged:
+    text.append("")
+    text.append("  Needing attention:")
+    for summary in flagged:
+      text.append(f"    {summary['inspection_id']}  {summary['disposition']}  PO {summary['po_numb']}-{summary['rel_numb']}  "
+                  f"{summary['series']} {summary['prod_code']}  Unit Rejects: {summary['unit_rejects']}")
+  text += ["", "  Thanks,", "  Hub Inspections", ""]
+  return "\n".join(text)
+
+
+@anvil.server.background_task
+def send_daily_digest(day=None):
+  """
+  Queue one digest email per active digest_recipients row for a day.
+  Runs daily at 06:00 (scheduled_tasks in anvil.yaml).
+
+  Args:
+      day: Date to report (default: yesterday). A list that already got this
+           day's digest is skipped, so re-running is safe.
+  """
+  day = day or (date.today() - timedelta(days=1))
+  key = period_key(PERIOD_DAY, day)
+
+  rollups = list(app_tables.quality_rollups.search(period_type=PERIOD_DAY, period_key=key))
+  start = datetime.combine(day, datetime.min.time())
+  flagged = list(app_tables.inspect_summary.search(
+    tables.order_by('inspection_id'),
+    q.fetch_only('inspection_id', 'disposition', 'po_numb', 'rel_numb', 'series', 'prod_code', 'unit_rejects'),
+    completed_date=q.between(start, start + timedelta(days=1)),
+    disposition=q.any_of('HOLD', 'REJECT')
+  ))
+
+  queued = 0
+  for recipients in app_tables.digest_recipients.search(is_active=True):
+    if recipients['last_digest_key'] == key:
+      continue
+
+    series = recipients['series']
+    lines, total = day_totals(r for r in rollups if not series or r['series'] == series)
+    if total['inspections'] == 0:
+      continue
+
+    queue_email(
+      split_addresses(recipients['emails']),
+      subject=f"Inspection Digest {key}" + (f" - {series}" if series else ""),
+      text=digest_text(day, lines, total, [s for s in flagged if not series or s['series'] == series])
+    )
+    recipients.update(last_digest_key=key, last_sent=datetime.now())
+    queued += 1
+
+  print(f"Queued {queued} digest emails for {key}")
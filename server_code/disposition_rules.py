@@ -0,0 +1,266 @@
+# Server Code → disposition_rules.py
+# Configurable ACCEPT/HOLD/REJECT rules, compiled once per server process.
+#
+# Each active disposition_rules row applies to a series and vendor tier (blank
+# matches any) and optionally to a sample-size range, and holds sampling-plan
+# style numbers:
+#   ACCEPT  when unit_rejects <= accept_units and all_rejects <= accept_all
+#   REJECT  when unit_rejects >= reject_units or all_rejects > max_hold_rejects
+#   HOLD    otherwise
+# The rules are validated and compiled into a lookup dict the first time they
+# are needed. Edits made through save/delete_disposition_rule bump a version
+# stamp in config_versions; each process checks that stamp at most once every
+# RULES_CHECK_INTERVAL and recompiles only when it has changed.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime, timedelta
+
+RULES_VERSION_NAME = 'disposition_rules'
+
+# How often a process re-reads the rules version stamp
+RULES_CHECK_INTERVAL = timedelta(seconds=60)
+
+# Used when no rule matches - the original hard-coded thresholds
+DEFAULT_RULE = {
+  'rule_id': None,
+  'min_sample_qty': None,
+  'max_sample_qty': None,
+  'accept_units': 0,
+  'accept_all': 0,
+  'reject_units': 2,
+  'max_hold_rejects': 3
+}
+
+RULE_NUMBERS = ('accept_units', 'accept_all', 'reject_units', 'max_hold_rejects')
+
+# Per-process compiled rules: {'version': int, 'checked': datetime, 'rules': dict}
+_compiled = {'version': None, 'checked': None, 'rules': None}
+
+
+def validate_rule(rule):
+  """
+  Check a rule's numbers before it is stored or compiled.
+
+  Raises:
+      ValueError: describing the first problem found
+  """
+  for name in RULE_NUMBERS:
+    value = rule.get(name)
+    if value is None or value < 0 or int(value) != value:
+      raise ValueError(f"{name} must be a whole number of 0 or more")
+  if rule['reject_units'] <= rule['accept_units']:
+    raise ValueError("reject_units must be greater than accept_units")
+  if rule['max_hold_rejects'] < rule['accept_all']:
+    raise ValueError("max_hold_rejects must not be less than accept_all")
+  low, high = rule.get('min_sample_qty'), rule.get('max_sample_qty')
+  if low is not None and high is not None and low > high:
+    raise ValueError("min_sample_qty must not be greater than max_sample_qty")
+
+
+def compile_rules(rows):
+  """
+  Build the in-memory lookup from rule rows.
+
+  Returns:
+      dict: (series, vendor_tier) -> list of rule dicts, highest priority first
+            ('' stands for "any")
+  """
+  rules = {}
+  for row in rows:
+    rule = {
+      'rule_id': row.get_id(),
+      'priority': row['priority'] or 0,
+      'min_sample_qty': row['min_sample_qty'],
+      'max_sample_qty': row['max_sample_qty'],
+    }
+    rule.update({name: row[name] for name in RULE_NUMBERS})
+    try:
+      validate_rule(rule)
+    except ValueError as e:
+      print(f"Skipping invalid disposition rule {rule['rule_id']}: {e}")
+      continue
+    rules.setdefault((row['series'] or '', row['vendor_tier'] or ''), []).append(rule)
+
+  for group in rules.values():
+    group.sort(key=lambda r: -r['priority'])
+  return rules
+
+
+def _rules_version():
+  row = app_tables.config_versions.get(name=RULES_VERSION_NAME)
+  return row['version'] if row else 0
+
+
+def compiled_rules():
+  """
+  Get the compiled rules, reloading them only when the version stamp has changed.
+
+  Bulk jobs can call this once and pass the result to evaluate().
+  """
+  now = datetime.now()
+  if _compiled['rules'] is None or now - _compiled['checked'] >= RULES_CHECK_INTERVAL:
+    version = _rules_version()
+    if _compiled['rules'] is None or version != _compiled['version']:
+      _compiled['rules'] = compile_rules(app_tables.disposition_rules.search(is_active=True))
+      _compiled['version'] = version
+      print(f"Compiled disposition rules version {version}")
+    _compiled['checked'] = now
+  return _compiled['rules']
+
+
+def find_rule(rules, series=None, vendor_tier=None, sample_qty=None):
+  """Most specific matching rule: series and tier, then series, then tier, then any."""
+  series, vendor_tier = series or '', vendor_tier or ''
+  for key in ((series, vendor_tier), (series, ''), ('', vendor_tier), ('', '')):
+    for rule in rules.get(key, []):
+      if sample_qty is not None:
+        if rule['min_sample_qty'] is not None and sample_qty < rule['min_sample_qty']:
+          continue
+        if rule['max_sample_qty'] is not None and sample_qty > rule['max_sample_qty']:
+          continue
+      return rule
+  return DEFAULT_RULE
+
+
+def evaluate(rules, unit_rejects, all_rejects, series=None, vendor_tier=None, sample_qty=None):
+  """
+  Apply the matching rule to an inspection's reject counts.
+
+  Returns:
+      tuple: (disposition, rule_id) - rule_id is None when the default rule applied
+  """
+  rule = find_rule(rules, series, vendor_tier, sample_qty)
+  if unit_rejects <= rule['accept_units'] and all_rejects <= rule['accept_all']:
+    disposition = 'ACCEPT'
+  elif unit_rejects >= rule['reject_units'] or all_rejects > rule['max_hold_rejects']:
+    disposition = 'REJECT'
+  else:
+    disposition = 'HOLD'
+  return disposition, rule['rule_id']
+
+
+def bump_rules_version():
+  """
+  Bump the rules version so every process recompiles on its next check.
+
+  Call in the transaction that writes the rule change, so no process can see
+  the new version without the new rules (or the other way round).
+  """
+  row = app_tables.config_versions.get(name=RULES_VERSION_NAME)
+  if row is None:
+    row = app_tables.config_versions.add_row(name=RULES_VERSION_NAME, version=0)
+  row['version'] = (row['version'] or 0) + 1
+  row['updated'] = datetime.now()
+
+
+@tables.in_transaction
+def _write_rule(rule_id, values):
+  """Create or update a rule row and bump the version stamp. Returns the row, or None if not found."""
+  if rule_id:
+    row = app_tables.disposition_rules.get_by_id(rule_id)
+    if row is None:
+      return None
+    row.update(**values)
+  else:
+    row = app_tables.disposition_rules.add_row(**values)
+  bump_rules_version()
+  return row
+
+
+@tables.in_transaction
+def _delete_rule(rule_id):
+  """Delete a rule row and bump the version stamp. Returns False if not found."""
+  row = app_tables.disposition_rules.get_by_id(rule_id)
+  if row is None:
+    return False
+  row.delete()
+  bump_rules_version()
+  return True
+
+
+def rule_to_dict(row):
+  """Convert a disposition_rules row to the dict sent to the client."""
+  rule = {
+    'rule_id': row.get_id(),
+    'series': row['series'],
+    'vendor_tier': row['vendor_tier'],
+    'min_sample_qty': row['min_sample_qty'],
+    'max_sample_qty': row['max_sample_qty'],
+    'priority': row['priority'],
+    'is_active': row['is_active']
+  }
+  rule.update({name: row[name] for name in RULE_NUMBERS})
+  return rule
+
+
+@anvil.server.callable
+def get_disposition_rules():
+  """
+  Get every disposition rule (active or not).
+
+  Returns:
+      list: Rule dicts ordered by series, vendor tier and priority
+  """
+  rows = app_tables.disposition_rules.search(
+    tables.order_by('series'), tables.order_by('vendor_tier'), tables.order_by('priority', ascending=False)
+  )
+  return [rule_to_dict(row) for row in rows]
+
+
+@anvil.server.callable
+def save_disposition_rule(rule):
+  """
+  Create or update a disposition rule.
+
+  Args:
+      rule: Dict with the rule columns; include 'rule_id' to update an existing rule
+
+  Returns:
+      dict: {'success': bool, 'message': str, 'rule': rule dict}
+  """
+  try:
+    validate_rule(rule)
+    values = {
+      'series': rule.get('series') or '',
+      'vendor_tier': rule.get('vendor_tier') or '',
+      'min_sample_qty': rule.get('min_sample_qty'),
+      'max_sample_qty': rule.get('max_sample_qty'),
+      'priority': rule.get('priority') or 0,
+      'is_active': rule.get('is_active', True),
+      'updated': datetime.now()
+    }
+    values.update({name: rule[name] for name in RULE_NUMBERS})
+
+    row = _write_rule(rule.get('rule_id'), values)
+    if row is None:
+      return {'success': False, 'message': 'Rule not found'}
+
+    # This process sees its own edit straight away
+    _compiled['rules'] = None
+    return {'success': True, 'message': 'Disposition rule saved', 'rule': rule_to_dict(row)}
+
+  except Exception as e:
+    return {'success': False, 'message': str(e)}
+
+
+@anvil.server.callable
+def delete_disposition_rule(rule_id):
+  """
+  Delete a disposition rule.
+
+  Returns:
+      dict: {'success': bool, 'message': str}
+  """
+  try:
+    if not _delete_rule(rule_id):
+      return {'success': False, 'message': 'Rule not found'}
+
+    # This process sees its own edit straight away
+    _compiled['rules'] = None
+    return {'success': True, 'message': 'Disposition rule deleted'}
+
+  except Exception as e:
+    return {'success': False, 'message': str(e)}
@@ -8,6 +8,10 @@ import anvil.tables as tables
 import anvil.tables.query as q
 from anvil.tables import app_tables
 from datetime import datetime
+from . import result_versions
+from . import save_requests
+from . import reject_counters
+from .summary_services import is_inspection_complete
 
 @anvil.server.callable
 def get_document_questions():
@@ -18,7 +22,8 @@ def get_document_questions():
   so no product_series filtering is needed.
       
   Returns:
-      List of dictionaries containing question_id and question_text, sorted by sort_no
+      List of dictionaries containing question_id, question_text and optional
+      (True if the question may be left unanswered), sorted by sort_no
   """
   # Query the document_questions table for all active questions
   questions = app_tables.document_questions.search(
@@ -31,6 +36,7 @@ def get_document_questions():
     question_list.append({
       'question_id': question['question_id'],
       'question_text': question['question_text'],
+      'optional': bool(question['is_optional']),
       'sort_no': question['sort_no']
     })
 
@@ -38,8 +44,83 @@ def get_document_questions():
   question_list.sort(key=lambda x: x['sort_no'])
   return question_list
 
+@tables.in_transaction
+def _write_document_results(inspection_id, question_results, inspector_name):
+  """
+  Check and write every result of one save in a single transaction, so the
+  version compare and the write of each cell are atomic: a concurrent save of
+  the same cell makes this one retry and see the newer version as a conflict.
+  The reject/progress counters are updated in the same transaction.
+
+  Returns:
+      Outcome dict
+  """
+  updated_count = 0
+  inserted_count = 0
+  conflicts = []
+  versions = {}
+  counter_deltas = reject_counters.new_deltas()  # Applied to the reject/progress counters
+  counters = reject_counters.ensure_counters(inspection_id)
+
+  # Process each question in the results
+  for question_id, result in question_results.items():
+    # Check if a record already exists for this inspection/question combination
+    existing_row = app_tables.document_results.get(
+      inspection_id=inspection_id,
+      question_id=question_id
+    )
+
+    if existing_row and result_versions.is_stale(existing_row, result):
+      # Another inspector saved this question after we loaded it
+      if not result_versions.same_answer(existing_row, result, 'note'):
+        conflicts.append(result_versions.conflict(None, question_id, existing_row, result, 'note', ('photo_media',)))
+      versions[question_id] = result_versions.row_version(existing_row)
+      continue
+
+    if existing_row:
+      # Update existing record
+      reject_counters.add_cell_change(counter_deltas, reject_counters.LOT_KEY, existing_row['pass_fail'], result.get('pass_fail'))
+      existing_row['pass_fail'] = result.get('pass_fail', 'Not Answered')
+      existing_row['note'] = result.get('note', '')
+      existing_row['photo_media'] = result.get('photo_media', None)
+      existing_row['inspected_by'] = inspector_name
+      existing_row['update_datetime'] = datetime.now()
+      existing_row['row_version'] = result_versions.row_version(existing_row) + 1
+      versions[question_id] = existing_row['row_version']
+      updated_count += 1
+    else:
+      # Insert new record
+      reject_counters.add_cell_change(counter_deltas, reject_counters.LOT_KEY, None, result.get('pass_fail'))
+      app_tables.document_results.add_row(
+        inspection_id=inspection_id,
+        question_id=question_id,
+        pass_fail=result.get('pass_fail', 'Not Answered'),
+        note=result.get('note', ''),
+        photo_media=result.get('photo_media', None),
+        inspected_by=inspector_name,
+        update_datetime=datetime.now(),
+        row_version=1
+      )
+      versions[question_id] = 1
+      inserted_count += 1
+
+  message = f'Document check results saved successfully - Updated: {updated_count}, New: {inserted_count}'
+  if conflicts:
+    message += f', Conflicts: {len(conflicts)}'
+
+  outcome = {
+    'success': True, 
+    'message': message,
+    'conflicts': conflicts,
+    'versions': versions
+  }
+  reject_counters.add_deltas(counters, 'document', counter_deltas)
+  if updated_count or inserted_count:
+    reject_counters.bump_results_version(counters)
+  return outcome
+
 @anvil.server.callable
-def save_document_inspection_results(inspection_id, question_results, inspector_name):
+def save_document_inspection_results(inspection_id, question_results, inspector_name, request_id=None):
   """
   Save all document check results to the document_results table.
   Updates existing records or inserts new ones.
@@ -52,49 +133,31 @@ def save_document_inspection_results(inspection_id, question_results, inspector_
       question_results: Dictionary of question results
                        Format: {'Q001': {'pass_fail': 'Pass', 'note': '', 'photo_media': None}, ...}
       inspector_name: Name of the inspector performing the check
+      request_id: Optional client-generated ID; a retry with the same ID returns
+                  the outcome of the first call instead of saving again
+
+  Results that carry a 'version' (as returned by
+  get_document_results_for_inspection) are only written if the stored row still
+  has that version; stale questions are skipped and returned in 'conflicts'
+  unless they already hold the same answer.
       
   Returns:
       Dictionary with success status and message indicating number of updates/inserts
   """
-  try:
-    updated_count = 0
-    inserted_count = 0
+  # A retried request that already completed gets its original outcome back
+  cached = save_requests.claim(request_id, 'document', inspection_id)
+  if cached is not None:
+    return cached
 
-    # Process each question in the results
-    for question_id, result in question_results.items():
-      # Check if a record already exists for this inspection/question combination
-      existing_row = app_tables.document_results.get(
-        inspection_id=inspection_id,
-        question_id=question_id
-      )
-
-      if existing_row:
-        # Update existing record
-        existing_row['pass_fail'] = result.get('pass_fail', 'Not Answered')
-        existing_row['note'] = result.get('note', '')
-        existing_row['photo_media'] = result.get('photo_media', None)
-        existing_row['inspected_by'] = inspector_name
-        existing_row['update_datetime'] = datetime.now()
-        updated_count += 1
-      else:
-        # Insert new record
-        app_tables.document_results.add_row(
-          inspection_id=inspection_id,
-          question_id=question_id,
-          pass_fail=result.get('pass_fail', 'Not Answered'),
-          note=result.get('note', ''),
-          photo_media=result.get('photo_media', None),
-          inspected_by=inspector_name,
-          update_datetime=datetime.now()
-        )
-        inserted_count += 1
-
-    return {
-      'success': True, 
-      'message': f'Document check results saved successfully - Updated: {updated_count}, New: {inserted_count}'
-    }
+  try:
+    outcome = _write_document_results(inspection_id, question_results, inspector_name)
+    save_requests.finish(request_id, outcome)
+    return outcome
   except Exception as e:
-    return {'success': False, 'message': str(e)}
+    # The transaction was rolled back - neither results nor counters were written
+    outcome = {'success': False, 'message': str(e)}
+    save_requests.finish(request_id, outcome)
+    return outcome
 
 @anvil.server.callable
 def get_document_inspection_summary(inspection_id):
@@ -158,9 +221,12 @@ def get_document_results_for_inspection(inspection_id):
         - photo_media: Uploaded photo (if any)
         - inspected_by: Name of inspector
         - update_datetime: When the result was recorded
+        - version: Row version, for conflict-aware saves
+        - complete: True once the inspection has been completed
   """
   # Fetch all results for this inspection
   results = app_tables.document_results.search(inspection_id=inspection_id)
+  complete = is_inspection_complete(inspection_id)
 
   # Organize results by question
   organized_results = {}
@@ -171,7 +237,9 @@ def get_document_results_for_inspection(inspection_id):
       'note': result['note'],
       'photo_media': result['photo_media'],
       'inspected_by': result['inspected_by'],
-      'update_datetime': result['update_datetime']
+      'update_datetime': result['update_datetime'],
+      'version': result_versions.row_version(result),
+      'complete': complete
     }
 
   return organized_results
@@ -6,15 +6,222 @@ import anvil.tables.query as q
 from anvil.tables import app_tables
 import anvil.server
 import re
+from datetime import datetime, timedelta
+
+# Outbox: callers queue messages in email_outbox and return straight away;
+# deliver_outbox sends them in the background in batches, retrying failures
+# with exponential backoff. deliver_outbox is also scheduled every 5 minutes
+# (anvil.yaml) so backed-off retries go out without new mail arriving. A lease
+# row in task_leases keeps to one sender at a time across sessions.
+
+DEFAULT_FROM_ADDRESS = "hubinspections@titanfci.com"
+DEFAULT_FROM_NAME = "Hub Inspections"
+
+STATUS_QUEUED = 'queued'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+# Messages claimed per batch
+BATCH_SIZE = 20
+
+# Attempts before a message is marked failed
+MAX_ATTEMPTS = 6
+
+# Retry delay: 1, 2, 4, 8 ... minutes, at most MAX_BACKOFF
+BASE_BACKOFF = timedelta(minutes=1)
+MAX_BACKOFF = timedelta(hours=1)
+
+# Longest a single send is expected to take
+SEND_TIMEOUT = timedelta(minutes=1)
+
+# The sender renews its lease before each message, so the lease only lapses
+# if the sender died or one send took far longer than SEND_TIMEOUT
+LEASE_DURATION = 2 * SEND_TIMEOUT
+
+# A message left 'sending' this long (the sender died) is queued again. A whole
+# batch is claimed at once, so this must clearly exceed the longest batch.
+SENDING_TIMEOUT = 2 * BATCH_SIZE * SEND_TIMEOUT
+
+# task_leases row held by the running sender; it expires if the sender dies
+SENDER_LEASE = 'deliver_outbox'
+
+
+def split_addresses(emails):
+  """Split a ';' or ',' separated address string into a list."""
+  return [e.strip() for e in re.split(r'[;,]\s*', emails or '') if e.strip()]
+
+
+def queue_email(to, subject, text=None, html=None, attachment=None,
+                from_address=DEFAULT_FROM_ADDRESS, from_name=DEFAULT_FROM_NAME):
+  """
+  Add a message to the outbox and make sure a sender is running.
+
+  Args:
+      to: List of recipient addresses
+      subject: Subject line
+      text: Plain-text body
+      html: Optional HTML body
+      attachment: Optional Media to attach
+
+  Returns:
+      The email_outbox row
+  """
+  now = datetime.now()
+  row = app_tables.email_outbox.add_row(
+    to=list(to),
+    subject=subject,
+    text=text,
+    html=html,
+    attachment=attachment,
+    from_address=from_address,
+    from_name=from_name,
+    status=STATUS_QUEUED,
+    attempts=0,
+    next_attempt=now,
+    created=now
+  )
+  start_sender()
+  return row
+
+
+def start_sender():
+  """Launch deliver_outbox unless a sender holds the lease (a burst of queued mail needs only one)."""
+  lease = app_tables.task_leases.get(name=SENDER_LEASE)
+  if lease and lease['expires'] and lease['expires'] > datetime.now():
+    return
+  anvil.server.launch_background_task('deliver_outbox')
+
+
+@tables.in_transaction
+def _take_lease():
+  """Take or extend the sender lease. Returns False if another live sender holds it."""
+  now = datetime.now()
+  holder = anvil.server.context.background_task_id
+  lease = app_tables.task_leases.get(name=SENDER_LEASE)
+  if lease is None:
+    app_tables.task_leases.add_row(name=SENDER_LEASE, holder=holder, expires=now + LEASE_DURATION)
+    return True
+  if lease['holder'] != holder and lease['expires'] and lease['expires'] > now:
+    return False
+  lease.update(holder=holder, expires=now + LEASE_DURATION)
+  return True
+
+
+@tables.in_transaction
+def _release_lease():
+  lease = app_tables.task_leases.get(name=SENDER_LEASE)
+  if lease and lease['holder'] == anvil.server.context.background_task_id:
+    lease.update(holder=None, expires=None)
+
+
+def backoff(attempts):
+  """Delay before retrying a message that has failed 'attempts' times."""
+  return min(BASE_BACKOFF * (2 ** (attempts - 1)), MAX_BACKOFF)
+
+
+@tables.in_transaction
+def _claim_batch():
+  """Mark the next due messages as sending so no other sender picks them up."""
+  now = datetime.now()
+  batch = []
+  due = app_tables.email_outbox.search(
+    tables.order_by('next_attempt'),
+    status=STATUS_QUEUED,
+    next_attempt=q.less_than_or_equal_to(now)
+  )
+  for row in due:
+    row['status'] = STATUS_SENDING
+    row['sending_since'] = now
+    batch.append(row)
+    if len(batch) == BATCH_SIZE:
+      break
+  return batch
+
+
+def _requeue_stuck():
+  cutoff = datetime.now() - SENDING_TIMEOUT
+  for row in app_tables.email_outbox.search(status=STATUS_SENDING, sending_since=q.less_than(cutoff)):
+    row.update(status=STATUS_QUEUED, next_attempt=datetime.now())
+
+
+def _send(row):
+  anvil.email.send(
+    to=row['to'],
+    from_address=row['from_address'],
+    from_name=row['from_name'],
+    subject=row['subject'],
+    text=row['text'],
+    html=row['html'],
+    attachments=[row['attachment']] if row['attachment'] else []
+  )
+
+
+@anvil.server.background_task
+def deliver_outbox():
+  """
+  Send every due outbox message, one claimed batch at a time.
+  Runs when mail is queued and every 5 minutes (see scheduled_tasks in
+  anvil.yaml), which sends the retries whose backoff has passed. Exits at once
+  if another sender holds the lease.
+  """
+  if not _take_lease():
+    print("Outbox delivery: another sender is running")
+    return
+
+  _requeue_stuck()
+
+  sent = failed = 0
+  lost_lease = False
+  while not lost_lease:
+    batch = _claim_batch()
+    if not batch:
+      break
+
+    for index, row in enumerate(batch):
+      # Renew the lease before every message, however slow the sends are
+      if not _take_lease():
+        # Another sender took over: hand back what we have not sent
+        print("Outbox delivery: lease lost, returning the rest of the batch")
+        for unsent in batch[index:]:
+          unsent.update(status=STATUS_QUEUED, next_attempt=datetime.now())
+        lost_lease = True
+        break
+
+      try:
+        _send(row)
+        row.update(status=STATUS_SENT, sent=datetime.now(), last_error=None)
+        sent += 1
+      except Exception as e:
+        attempts = (row['attempts'] or 0) + 1
+        print(f"ERROR sending email '{row['subject']}' (attempt {attempts}): {str(e)}")
+        row.update(
+          attempts=attempts,
+          last_error=str(e),
+          status=STATUS_FAILED if attempts >= MAX_ATTEMPTS else STATUS_QUEUED,
+          next_attempt=datetime.now() + backoff(attempts)
+        )
+        failed += 1
+
+  _release_lease()
+  print(f"Outbox delivery: {sent} sent, {failed} failed attempts")
+
 
 @anvil.server.callable
 def email_summary(ins_id, ins_date, po_num, rel_num, series, prod_code, samp_qty, unit_reject, tot_reject, emails, message):
-  email_list = [e.strip() for e in re.split(r'[;,]\s*', emails) if e.strip()]
-  anvil.email.send(to=email_list, 
-                   from_address="hubinspections@titanfci.com",
-                   from_name="Hub Inspections",
-                   subject="Incoming Inspection",
-                   text=f"""
+  """
+  Queue the inspection summary email; it is sent in the background.
+
+  Returns:
+      dict: {'success': bool, 'message': str}
+  """
+  email_list = split_addresses(emails)
+  if not email_list:
+    return {'success': False, 'message': 'Enter at least one email address'}
+
+  queue_email(email_list,
+              subject="Incoming Inspection",
+              text=f"""
   Inspection Number:  {ins_id}
   Inspection Date:  {ins_date}
   Purchase Order:  {po_num}-{rel_num}
@@ -25,4 +232,5 @@ def email_summary(ins_id, ins_date, po_num, rel_num, series, prod_code, samp_qty
 
   Thanks,
   Hub Inspections
-  """)
\ No newline at end of file
+  """)
+  return {'success': True, 'message': f'Email queued for {len(email_list)} recipient(s)'}
@@ -8,6 +8,10 @@ import anvil.tables as tables
 import anvil.tables.query as q
 from anvil.tables import app_tables
 from datetime import datetime
+from . import result_versions
+from . import save_requests
+from . import reject_counters
+from .summary_services import is_inspection_complete
 
 @anvil.server.callable
 def get_functional_questions(product_series):
@@ -18,7 +22,8 @@ def get_functional_questions(product_series):
       product_series: The product series to get questions for (e.g., 'Titan A', 'Titan B')
       
   Returns:
-      List of dictionaries containing question_id and question_text, sorted by question_id
+      List of dictionaries containing question_id, question_text and optional
+      (True if the question may be left unanswered), sorted by question_id
   """
   # Query the functional_questions table for active questions matching the product series
   questions = app_tables.functional_questions.search(
@@ -31,15 +36,98 @@ def get_functional_questions(product_series):
   for question in questions:
     question_list.append({
       'question_id': question['question_id'],
-      'question_text': question['question_text']
+      'question_text': question['question_text'],
+      'optional': bool(question['is_optional'])
     })
 
   # Sort questions by question_id for consistent ordering
   question_list.sort(key=lambda x: x['question_id'])
   return question_list
 
+@tables.in_transaction
+def _write_functional_results(inspection_id, sample_results, inspector_name):
+  """
+  Check and write every result of one save in a single transaction, so the
+  version compare and the write of each cell are atomic: a concurrent save of
+  the same cell makes this one retry and see the newer version as a conflict.
+  The reject/progress counters are updated in the same transaction.
+
+  Returns:
+      Outcome dict
+  """
+  updated_count = 0
+  inserted_count = 0
+  conflicts = []
+  versions = {}
+  counter_deltas = reject_counters.new_deltas()  # Applied to the reject/progress counters
+  counters = reject_counters.ensure_counters(inspection_id)
+
+  # Process each sample in the results
+  for sample_key, questions in sample_results.items():
+    # Extract sample number from key (e.g., 'sample_1' -> 1)
+    sample_number = int(sample_key.split('_')[1])
+
+    # Process each question in the sample
+    for question_id, result in questions.items():
+      # Check if a record already exists for this inspection/sample/question combination
+      existing_row = app_tables.functional_results.get(
+        inspection_id=inspection_id,
+        sample_number=sample_number,
+        question_id=question_id
+      )
+
+      if existing_row and result_versions.is_stale(existing_row, result):
+        # Another inspector saved this cell after we loaded it
+        if not result_versions.same_answer(existing_row, result, 'notes'):
+          conflicts.append(result_versions.conflict(sample_key, question_id, existing_row, result, 'notes', ('photo',)))
+        versions.setdefault(sample_key, {})[question_id] = result_versions.row_version(existing_row)
+        continue
+
+      if existing_row:
+        # Update existing record
+        reject_counters.add_cell_change(counter_deltas, str(sample_number), existing_row['pass_fail'], result.get('pass_fail'))
+        existing_row['pass_fail'] = result.get('pass_fail', 'Not Answered')
+        existing_row['notes'] = result.get('notes', '')
+        existing_row['photo'] = result.get('photo', None)
+        existing_row['inspected_by'] = inspector_name
+        existing_row['update_datetime'] = datetime.now()
+        existing_row['row_version'] = result_versions.row_version(existing_row) + 1
+        versions.setdefault(sample_key, {})[question_id] = existing_row['row_version']
+        updated_count += 1
+      else:
+        # Insert new record
+        reject_counters.add_cell_change(counter_deltas, str(sample_number), None, result.get('pass_fail'))
+        app_tables.functional_results.add_row(
+          inspection_id=inspection_id,
+          sample_number=sample_number,
+          question_id=question_id,
+          pass_fail=result.get('pass_fail', 'Not Answered'),
+          notes=result.get('notes', ''),
+          photo=result.get('photo', None),
+          inspected_by=inspector_name,
+          update_datetime=datetime.now(),
+          row_version=1
+        )
+        versions.setdefault(sample_key, {})[question_id] = 1
+        inserted_count += 1
+
+  message = f'Functional check results saved successfully - Updated: {updated_count}, New: {inserted_count}'
+  if conflicts:
+    message += f', Conflicts: {len(conflicts)}'
+
+  outcome = {
+    'success': True, 
+    'message': message,
+    'conflicts': conflicts,
+    'versions': versions
+  }
+  reject_counters.add_deltas(counters, 'functional', counter_deltas)
+  if updated_count or inserted_count:
+    reject_counters.bump_results_version(counters)
+  return outcome
+
 @anvil.server.callable
-def save_functional_inspection_results(inspection_id, sample_results, inspector_name):
+def save_functional_inspection_results(inspection_id, sample_results, inspector_name, request_id=None):
   """
   Save all functional check results to the functional_results table.
   Updates existing records or inserts new ones.
@@ -49,56 +137,31 @@ def save_functional_inspection_results(inspection_id, sample_results, inspector_
       sample_results: Dictionary of sample results
                      Format: {'sample_1': {'Q001': {...}}, 'sample_2': {...}}
       inspector_name: Name of the inspector performing the check
+      request_id: Optional client-generated ID; a retry with the same ID returns
+                  the outcome of the first call instead of saving again
+
+  Results that carry a 'version' (as returned by
+  get_functional_results_for_inspection) are only written if the stored cell
+  still has that version; stale cells are skipped and returned in 'conflicts'
+  unless they already hold the same answer.
       
   Returns:
       Dictionary with success status and message indicating number of updates/inserts
   """
-  try:
-    updated_count = 0
-    inserted_count = 0
-
-    # Process each sample in the results
-    for sample_key, questions in sample_results.items():
-      # Extract sample number from key (e.g., 'sample_1' -> 1)
-      sample_number = int(sample_key.split('_')[1])
-
-      # Process each question in the sample
-      for question_id, result in questions.items():
-        # Check if a record already exists for this inspection/sample/question combination
-        existing_row = app_tables.functional_results.get(
-          inspection_id=inspection_id,
-          sample_number=sample_number,
-          question_id=question_id
-        )
+  # A retried request that already completed gets its original outcome back
+  cached = save_requests.claim(request_id, 'functional', inspection_id)
+  if cached is not None:
+    return cached
 
-        if existing_row:
-          # Update existing record
-          existing_row['pass_fail'] = result.get('pass_fail', 'Not Answered')
-          existing_row['notes'] = result.get('notes', '')
-          existing_row['photo'] = result.get('photo', None)
-          existing_row['inspected_by'] = inspector_name
-          existing_row['update_datetime'] = datetime.now()
-          updated_count += 1
-        else:
-          # Insert new record
-          app_tables.functional_results.add_row(
-            inspection_id=inspection_id,
-            sample_number=sample_number,
-            question_id=question_id,
-            pass_fail=result.get('pass_fail', 'Not Answered'),
-            notes=result.get('notes', ''),
-            photo=result.get('photo', None),
-            inspected_by=inspector_name,
-            update_datetime=datetime.now()
-          )
-          inserted_count += 1
-
-    return {
-      'success': True, 
-      'message': f'Functional check results saved successfully - Updated: {updated_count}, New: {inserted_count}'
-    }
+  try:
+    outcome = _write_functional_results(inspection_id, sample_results, inspector_name)
+    save_requests.finish(request_id, outcome)
+    return outcome
   except Exception as e:
-    return {'success': False, 'message': str(e)}
+    # The transaction was rolled back - neither results nor counters were written
+    outcome = {'success': False, 'message': str(e)}
+    save_requests.finish(request_id, outcome)
+    return outcome
 
 @anvil.server.callable
 def get_functional_inspection_summary(inspection_id):
@@ -177,9 +240,12 @@ def get_functional_results_for_inspection(inspection_id):
         - photo: Uploaded photo (if any)
         - inspected_by: Name of inspector
         - update_datetime: When the result was recorded
+        - version: Row version, for conflict-aware saves
+        - complete: True once the inspection has been completed
   """
   # Fetch all results for this inspection
   results = app_tables.functional_results.search(inspection_id=inspection_id)
+  complete = is_inspection_complete(inspection_id)
 
   # Organize results by sample and question
   organized_results = {}
@@ -194,7 +260,9 @@ def get_functional_results_for_inspection(inspection_id):
       'notes': result['notes'],
       'photo': result['photo'],
       'inspected_by': result['inspected_by'],
-      'update_datetime': result['update_datetime']
+      'update_datetime': result['update_datetime'],
+      'version': result_versions.row_version(result),
+      'complete': complete
     }
 
   return organized_results
\ No newline at end of file
@@ -0,0 +1,62 @@
+# Server Code → id_sequences.py
+# Transactional ID sequences kept in the counter table.
+#
+# Each sequence is one counter row, found by name, whose 'count' is the next
+# unallocated value. Allocating reads and bumps that single row inside a
+# transaction, so two inspectors saving at the same moment can never get the
+# same number. Each server process reserves a block of values at a time and
+# hands them out from memory; values left in a block when a process ends are
+# skipped, so IDs are unique and increasing per process but may have gaps.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+import threading
+
+INSPECTION_SEQUENCE = 'inspection'
+
+# Values reserved per transaction (1 = no pre-allocation)
+DEFAULT_BLOCK_SIZE = 10
+
+# name -> [next value, end of block (exclusive)]
+_blocks = {}
+_lock = threading.Lock()
+
+
+@tables.in_transaction
+def reserve(name, size=1):
+  """
+  Reserve 'size' consecutive values of a sequence.
+
+  The first call for a name adopts the highest unnamed counter row (the
+  original single inspection counter), so numbering carries on from it.
+
+  Returns:
+      int: The first reserved value
+  """
+  row = app_tables.counter.get(name=name)
+  if row is None:
+    legacy = [r['count'] for r in app_tables.counter.search(name=None) if r['count'] is not None]
+    row = app_tables.counter.add_row(name=name, count=max(legacy, default=0))
+
+  start = row['count'] or 0
+  row['count'] = start + size
+  return start
+
+
+def next_value(name, block_size=DEFAULT_BLOCK_SIZE):
+  """Next value of a sequence, reserving a new block only when this process has used up its own."""
+  with _lock:
+    block = _blocks.get(name)
+    if block is None or block[0] >= block[1]:
+      start = reserve(name, block_size)
+      block = _blocks[name] = [start, start + block_size]
+    value = block[0]
+    block[0] += 1
+    return value
+
+
+def next_inspection_id():
+  """Allocate a new inspection header ID, e.g. 'INS-1042'."""
+  return f"INS-{next_value(INSPECTION_SEQUENCE)}"
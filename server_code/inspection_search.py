@@ -0,0 +1,131 @@
+# Server Code → inspection_search.py
+# Search over past inspections by PO/release, series, product code and date.
+#
+# inspect_head carries maintained lookup columns so every filter is an exact
+# column match rather than a scan:
+#   po_key      - normalized PO number              e.g. 'PO12345'
+#   po_rel_key  - normalized PO number and release  e.g. 'PO12345-2'
+#   month_key   - inspection month bucket           e.g. '2025-03'
+#   dup_key     - PO, release and product code      e.g. 'PO12345-2|V100-2'
+# dup_key is what save_head uses to find an open inspection of the same lot.
+# Summaries are joined to the matched headers by inspection_id.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+
+# Largest number of inspections one search returns
+MAX_RESULTS = 200
+
+
+def normalize_key(value):
+  """Normalize a PO/release value for matching (trimmed, upper case, no inner spaces)."""
+  return "".join(str(value or "").split()).upper()
+
+
+def search_keys(po_numb, rel_numb, ins_date):
+  """
+  Build the lookup column values for an inspection.
+
+  Returns:
+      dict: {'po_key': str, 'po_rel_key': str, 'month_key': str or None}
+  """
+  return {
+    'po_key': normalize_key(po_numb),
+    'po_rel_key': f"{normalize_key(po_numb)}-{normalize_key(rel_numb)}",
+    'month_key': ins_date.strftime('%Y-%m') if ins_date else None
+  }
+
+
+def duplicate_key(po_numb, rel_numb, prod_code):
+  """Lookup value identifying one lot: normalized PO, release and product code."""
+  return f"{normalize_key(po_numb)}-{normalize_key(rel_numb)}|{normalize_key(prod_code)}"
+
+
+@anvil.server.callable
+def search_inspections(po_numb=None, rel_numb=None, series=None, prod_code=None,
+                       month=None, date_from=None, date_to=None, limit=50):
+  """
+  Find inspections (in progress or completed) matching the given filters.
+
+  Args:
+      po_numb: Optional PO number (case and spacing are ignored)
+      rel_numb: Optional release number, used together with po_numb
+      series: Optional product series
+      prod_code: Optional product code
+      month: Optional 'YYYY-MM' inspection month
+      date_from: Optional earliest inspection date (inclusive)
+      date_to: Optional latest inspection date (inclusive)
+      limit: Maximum number of results (at most MAX_RESULTS)
+
+  Returns:
+      list: Newest first, one dict per inspection with header fields plus
+            unit_rejects, all_rejects and completed_date when completed
+  """
+  limit = max(1, min(int(limit), MAX_RESULTS))
+
+  filters = {}
+  if po_numb and rel_numb:
+    filters['po_rel_key'] = search_keys(po_numb, rel_numb, None)['po_rel_key']
+  elif po_numb:
+    filters['po_key'] = normalize_key(po_numb)
+  if series:
+    filters['series'] = series
+  if prod_code:
+    filters['prod_code'] = prod_code
+  if month:
+    filters['month_key'] = month
+  if date_from and date_to:
+    filters['ins_date'] = q.between(date_from, date_to, max_inclusive=True)
+  elif date_from:
+    filters['ins_date'] = q.greater_than_or_equal_to(date_from)
+  elif date_to:
+    filters['ins_date'] = q.less_than_or_equal_to(date_to)
+
+  headers = []
+  for header in app_tables.inspect_head.search(tables.order_by('ins_date', ascending=False), **filters):
+    headers.append(header)
+    if len(headers) == limit:
+      break
+
+  # One lookup for the summaries of all matched inspections
+  ids = [h['id_head'] for h in headers if h['id_head']]
+  summaries = {}
+  if ids:
+    for summary in app_tables.inspect_summary.search(inspection_id=q.any_of(*ids)):
+      summaries[summary['inspection_id']] = summary
+
+  results = []
+  for header in headers:
+    summary = summaries.get(header['id_head'])
+    results.append({
+      'inspection_id': header['id_head'],
+      'inspection_date': header['ins_date'],
+      'po_numb': header['po_numb'],
+      'rel_numb': header['rel_numb'],
+      'series': header['series'],
+      'prod_code': header['prod_code'],
+      'sample_qty': header['sam_qty'],
+      'status': header['status'],
+      'unit_rejects': summary['unit_rejects'] if summary else None,
+      'all_rejects': summary['all_rejects'] if summary else None,
+      'completed_date': summary['completed_date'] if summary else None
+    })
+
+  return results
+
+
+@anvil.server.background_task
+def rebuild_search_keys():
+  """
+  Fill the lookup columns of inspections saved before they existed.
+  Run once from the Background Tasks panel after deploying.
+  """
+  count = 0
+  for header in app_tables.inspect_head.search():
+    header.update(**search_keys(header['po_numb'], header['rel_numb'], header['ins_date']),
+                  dup_key=duplicate_key(header['po_numb'], header['rel_numb'], header['prod_code']))
+    count += 1
+
+  print(f"Rebuilt search keys for {count} inspections")
@@ -0,0 +1,214 @@
+# Server Code → pareto_services.py
+# Question-level failure Pareto across completed inspections.
+#
+# compute_failure_pareto runs as a background task: it exports the answers of
+# every completed inspection in a date window as arrays and counts failures by
+# (section, product_series, question_id) with numpy. The result is cached in
+# failure_pareto, so get_failure_pareto only reads one row.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime
+import numpy as np
+from .summary_services import SECTIONS, QUESTION_TABLES
+
+STATUS_RUNNING = 'running'
+STATUS_READY = 'ready'
+
+# Inspections per results-table lookup
+ID_CHUNK = 500
+
+# Largest number of Pareto rows get_failure_pareto returns
+MAX_TOP = 100
+
+
+def window_key(date_from, date_to):
+  """Cache key for a date window, e.g. '2025-01-01..2025-03-31'."""
+  return f"{date_from.isoformat() if date_from else ''}..{date_to.isoformat() if date_to else ''}"
+
+
+def _completed_series(date_from, date_to):
+  """inspection_id -> series of the completed inspections in the window."""
+  filters = {}
+  if date_from and date_to:
+    filters['inspection_date'] = q.between(date_from, date_to, max_inclusive=True)
+  elif date_from:
+    filters['inspection_date'] = q.greater_than_or_equal_to(date_from)
+  elif date_to:
+    filters['inspection_date'] = q.less_than_or_equal_to(date_to)
+
+  summaries = app_tables.inspect_summary.search(q.fetch_only('inspection_id', 'series'), **filters)
+  return {s['inspection_id']: s['series'] or '' for s in summaries}
+
+
+def _export_answers(section, series_by_id):
+  """
+  Export one section's answers for the given inspections as parallel arrays.
+
+  Returns:
+      tuple: (keys, failed) - keys is an array of 'series|question_id' strings,
+             failed a boolean array marking Fail/Reject answers
+  """
+  table, _ = SECTIONS[section]
+  ids = list(series_by_id)
+  keys = []
+  answers = []
+  for start in range(0, len(ids), ID_CHUNK):
+    rows = table.search(
+      q.fetch_only('inspection_id', 'question_id', 'pass_fail'),
+      inspection_id=q.any_of(*ids[start:start + ID_CHUNK])
+    )
+    for row in rows:
+      keys.append(f"{series_by_id[row['inspection_id']]}|{row['question_id']}")
+      answers.append(row['pass_fail'] or '')
+
+  answers = np.char.upper(np.array(answers, dtype=str))
+  failed = (answers == 'FAIL') | (answers == 'REJECT')
+  return np.array(keys, dtype=str), failed
+
+
+def _question_texts(section):
+  """(product_series, question_id) -> question text for one section."""
+  texts = {}
+  for question in QUESTION_TABLES[section].search(q.fetch_only('product_series', 'question_id', 'question_text')):
+    texts[(question['product_series'] or '', question['question_id'])] = question['question_text']
+  return texts
+
+
+def count_failures(series_by_id):
+  """
+  Count failures and answers by (section, product_series, question_id).
+
+  Returns:
+      list: One dict per question with at least one failure, most failures first
+  """
+  pareto = []
+  for section in SECTIONS:
+    keys, failed = _export_answers(section, series_by_id)
+    if not failed.any():
+      continue
+
+    answered_keys, answered_counts = np.unique(keys, return_counts=True)
+    fail_keys, fail_counts = np.unique(keys[failed], return_counts=True)
+    # np.unique returns sorted keys, so failed keys can be located in the answered ones
+    answered_for_fail = answered_counts[np.searchsorted(answered_keys, fail_keys)]
+
+    texts = _question_texts(section)
+    for key, failures, answered in zip(fail_keys.tolist(), fail_counts.tolist(), answered_for_fail.tolist()):
+      product_series, question_id = key.split('|', 1)
+      pareto.append({
+        'section': section,
+        'product_series': product_series,
+        'question_id': question_id,
+        'question_text': texts.get((product_series, question_id)) or texts.get(('', question_id)),
+        'failures': failures,
+        'answered': answered,
+        'fail_rate': failures / answered
+      })
+
+  pareto.sort(key=lambda r: (-r['failures'], r['section'], r['product_series'], r['question_id']))
+  return pareto
+
+
+@anvil.server.background_task
+def compute_failure_pareto(date_from=None, date_to=None):
+  """
+  Count question failures over completed inspections in a date window and cache the result.
+
+  Args:
+      date_from: Optional earliest inspection date (inclusive)
+      date_to: Optional latest inspection date (inclusive)
+  """
+  key = window_key(date_from, date_to)
+  print(f"=== COMPUTING FAILURE PARETO {key} ===")
+
+  try:
+    series_by_id = _completed_series(date_from, date_to)
+    pareto = count_failures(series_by_id) if series_by_id else []
+  except Exception:
+    # Release the window so the next request can start the job again
+    row = app_tables.failure_pareto.get(window_key=key)
+    if row and row['rows'] is None:
+      row.delete()
+    elif row:
+      row['status'] = STATUS_READY
+    raise
+
+  row = app_tables.failure_pareto.get(window_key=key)
+  if row is None:
+    row = app_tables.failure_pareto.add_row(window_key=key, date_from=date_from, date_to=date_to)
+  row.update(
+    status=STATUS_READY,
+    rows=pareto,
+    inspections=len(series_by_id),
+    total_failures=sum(r['failures'] for r in pareto),
+    computed=datetime.now()
+  )
+
+  print(f"Pareto computed from {len(series_by_id)} inspections: {len(pareto)} failing questions")
+
+
+@tables.in_transaction
+def _claim_window(date_from, date_to, refresh):
+  """Mark a window as being computed. Returns False if it is cached or already running."""
+  key = window_key(date_from, date_to)
+  row = app_tables.failure_pareto.get(window_key=key)
+  if row is None:
+    app_tables.failure_pareto.add_row(window_key=key, date_from=date_from, date_to=date_to, status=STATUS_RUNNING)
+    return True
+  if row['status'] == STATUS_RUNNING or not refresh:
+    return False
+  row['status'] = STATUS_RUNNING
+  return True
+
+
+@anvil.server.callable
+def get_failure_pareto(date_from=None, date_to=None, section=None, product_series=None, top=20, refresh=False):
+  """
+  Get the cached failure Pareto for a date window, starting the batch job if needed.
+
+  Args:
+      date_from: Optional earliest inspection date (inclusive)
+      date_to: Optional latest inspection date (inclusive)
+      section: Optional section filter ('document', 'visual', 'dimension', 'functional')
+      product_series: Optional product series filter
+      top: Number of questions to return (at most MAX_TOP)
+      refresh: Recompute even if a cached result exists
+
+  Returns:
+      dict: {'ready': bool, 'computed': datetime, 'inspections': int, 'total_failures': int,
+             'rows': list with 'cumulative_pct' added to each row}
+  """
+  try:
+    if _claim_window(date_from, date_to, refresh):
+      anvil.server.launch_background_task('compute_failure_pareto', date_from, date_to)
+
+    row = app_tables.failure_pareto.get(window_key=window_key(date_from, date_to))
+    if row['rows'] is None:
+      return {'ready': False, 'message': 'Failure Pareto is being computed. Please check back shortly.'}
+
+    rows = [r for r in row['rows']
+            if (not section or r['section'] == section)
+            and (not product_series or r['product_series'] == product_series)]
+    total = sum(r['failures'] for r in rows)
+
+    top_rows = []
+    running = 0
+    for r in rows[:max(1, min(int(top), MAX_TOP))]:
+      running += r['failures']
+      top_rows.append(dict(r, cumulative_pct=100.0 * running / total))
+
+    return {
+      'ready': True,
+      'refreshing': row['status'] == STATUS_RUNNING,
+      'computed': row['computed'],
+      'inspections': row['inspections'],
+      'total_failures': total,
+      'rows': top_rows
+    }
+
+  except Exception as e:
+    print(f"ERROR getting failure pareto: {str(e)}")
+    return {'ready': False, 'message': str(e)}
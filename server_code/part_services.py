@@ -129,4 +129,39 @@ def get_part_details(line, series, part_code):
       return None
   except Exception as e:
     print(f"Error getting part details: {str(e)}")
-    return None
\ No newline at end of file
+    return None
+@anvil.server.callable
+def get_part_selection(series, part_code):
+  """
+  Get everything needed to show a saved series/part code in the cascading dropdowns.
+  The header does not store the product line, so it is looked up from the part.
+  
+  Args:
+    series: The saved series value
+    part_code: The saved part code value
+  
+  Returns:
+    dict: {'line': str or None, 'series_list': list, 'part_codes': list}
+          Values missing from part_mstr are still included so they can be shown
+  """
+  try:
+    part = None
+    if series:
+      filters = {'series': series}
+      if part_code:
+        filters['part_code'] = part_code
+      part = next(iter(app_tables.part_mstr.search(**filters)), None)
+
+    line = part['line'] if part else None
+    series_list = get_series_by_line(line) if line else []
+    part_codes = get_part_codes_by_series(line, series) if line else []
+
+    if series and series not in series_list:
+      series_list.append(series)
+    if part_code and part_code not in part_codes:
+      part_codes.append(part_code)
+
+    return {'line': line, 'series_list': series_list, 'part_codes': part_codes}
+  except Exception as e:
+    print(f"Error getting part selection for series '{series}' and part code '{part_code}': {str(e)}")
+    return {'line': None, 'series_list': [series] if series else [], 'part_codes': [part_code] if part_code else []}
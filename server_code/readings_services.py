@@ -0,0 +1,250 @@
+# Server Code → readings_services.py
+# Time-series readings (pressure/leak curves) from functional and hydro test benches.
+#
+# Each reading series is one functional_readings row holding the whole curve as
+# a packed little-endian float32 array of interleaved (time, value) pairs,
+# rather than one row per point. Curve limits are piecewise-linear envelopes
+# set on the functional question:
+#   curve_limits = {'pressure': {'min': [[t, v], ...], 'max': [[t, v], ...]}, ...}
+# Readings are checked against the envelope and downsampled for display with
+# NumPy.
+
+import anvil
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime
+import numpy as np
+
+# Packed point format: (time, value) as little-endian float32
+POINT_DTYPE = np.dtype('<f4')
+
+# Largest number of points get_functional_reading sends to the client
+MAX_DISPLAY_POINTS = 2000
+
+
+def pack_series(times, values):
+  """Pack a reading series into bytes of interleaved float32 (time, value) pairs."""
+  return np.column_stack((times, values)).astype(POINT_DTYPE).tobytes()
+
+
+def unpack_series(data):
+  """
+  Unpack bytes written by pack_series.
+
+  Returns:
+      tuple: (times, values) as float arrays
+  """
+  points = np.frombuffer(data, dtype=POINT_DTYPE).reshape(-1, 2)
+  return points[:, 0].astype(float), points[:, 1].astype(float)
+
+
+def require_increasing(x, name):
+  """
+  Check that a time axis is strictly increasing, as np.interp and the
+  downsampling buckets assume (they return wrong results otherwise).
+
+  Raises:
+      ValueError: if it is not
+  """
+  if x.size > 1 and not np.all(np.diff(x) > 0):
+    raise ValueError(f"{name} must be strictly increasing")
+
+
+def evaluate_limits(times, values, limits):
+  """
+  Check a curve against its min/max envelope.
+
+  Args:
+      times: Array of reading times
+      values: Array of reading values
+      limits: {'min': [[t, v], ...], 'max': [[t, v], ...]}; either side may be
+              missing. Envelopes are interpolated linearly and held flat
+              outside their first and last points.
+
+  Returns:
+      dict: {'pass_fail': 'Pass'/'Fail'/None (no limits), 'violations': int,
+             'first_violation': time of the first point outside the envelope or None}
+
+  Raises:
+      ValueError: if the times or an envelope's times are not strictly increasing
+  """
+  if not limits or not (limits.get('min') or limits.get('max')):
+    return {'pass_fail': None, 'violations': 0, 'first_violation': None}
+
+  require_increasing(times, 'times')
+  outside = np.zeros(values.shape, dtype=bool)
+  for side, compare in (('min', np.less), ('max', np.greater)):
+    envelope = limits.get(side)
+    if envelope:
+      env = np.asarray(envelope, dtype=float)
+      if env.ndim != 2 or env.shape[1] != 2:
+        raise ValueError(f"{side} limit must be a list of [t, v] points")
+      require_increasing(env[:, 0], f"{side} limit times")
+      outside |= compare(values, np.interp(times, env[:, 0], env[:, 1]))
+
+  hits = np.flatnonzero(outside)
+  return {
+    'pass_fail': 'Fail' if hits.size else 'Pass',
+    'violations': int(hits.size),
+    'first_violation': float(times[hits[0]]) if hits.size else None
+  }
+
+
+def downsample(times, values, max_points):
+  """
+  Reduce a curve to about max_points points for display.
+
+  Each bucket keeps its minimum and maximum, so spikes and drops stay visible.
+
+  Returns:
+      tuple: (times, values) arrays
+
+  Raises:
+      ValueError: if the times are not strictly increasing
+  """
+  n = values.size
+  if n <= max_points:
+    return times, values
+
+  require_increasing(times, 'times')
+
+  starts = np.arange(0, n, int(np.ceil(2 * n / max_points)))
+  mins = np.minimum.reduceat(values, starts)
+  maxs = np.maximum.reduceat(values, starts)
+  ends = np.append(starts[1:], n) - 1
+  return (np.column_stack((times[starts], times[ends])).ravel(),
+          np.column_stack((mins, maxs)).ravel())
+
+
+def _curve_limits(inspection_id, question_id, channel):
+  """Envelope for a channel of a functional question of this inspection's series."""
+  header = app_tables.inspect_head.get(id_head=inspection_id)
+  if header is None:
+    return None
+  question = app_tables.functional_questions.get(product_series=header['series'], question_id=question_id)
+  if question is None or not question['curve_limits']:
+    return None
+  return question['curve_limits'].get(channel)
+
+
+@tables.in_transaction
+def _store_reading(key, reading):
+  """Insert or replace one reading, so two posts of the same curve cannot both insert."""
+  row = app_tables.functional_readings.get(**key)
+  if row:
+    row.update(**reading)
+  else:
+    app_tables.functional_readings.add_row(**key, **reading)
+
+
+@anvil.server.callable
+def ingest_functional_reading(inspection_id, sample_number, question_id, channel, times, values, source=None):
+  """
+  Store a reading series from a test bench and check it against the curve limits.
+
+  Sending the same inspection/sample/question/channel again replaces the stored series.
+
+  Args:
+      inspection_id: The inspection ID
+      sample_number: Sample the reading belongs to (None for a lot-level test such as hydro)
+      question_id: Functional question the curve belongs to
+      channel: Measured quantity, e.g. 'pressure' or 'leak'
+      times: Reading times (seconds from test start)
+      values: Reading values, same length as times
+      source: Optional bench identifier
+
+  Returns:
+      dict: {'success': bool, 'message': str, 'pass_fail': 'Pass'/'Fail'/None,
+             'violations': int, 'first_violation': float or None, 'point_count': int}
+  """
+  try:
+    t = np.asarray(times, dtype=float)
+    v = np.asarray(values, dtype=float)
+    if t.shape != v.shape or t.ndim != 1 or t.size == 0:
+      return {'success': False, 'message': 'times and values must be non-empty lists of the same length'}
+    # NaN compares False against both envelope sides, so it would pass the limit check
+    if not (np.isfinite(t).all() and np.isfinite(v).all()):
+      return {'success': False, 'message': 'times and values must be finite numbers'}
+    # Limit checks and downsampling assume time order; raises ValueError otherwise
+    require_increasing(t, 'times')
+
+    check = evaluate_limits(t, v, _curve_limits(inspection_id, question_id, channel))
+    data = anvil.BlobMedia('application/octet-stream', pack_series(t, v),
+                           name=f"{inspection_id}_{sample_number}_{question_id}_{channel}.f32")
+
+    reading = {
+      'point_count': int(t.size),
+      't_start': float(t.min()),
+      't_end': float(t.max()),
+      'v_min': float(v.min()),
+      'v_max': float(v.max()),
+      'data': data,
+      'limit_result': check['pass_fail'],
+      'violations': check['violations'],
+      'source': source,
+      'captured': datetime.now()
+    }
+
+    _store_reading(dict(inspection_id=inspection_id, sample_number=sample_number,
+                        question_id=question_id, channel=channel), reading)
+
+    return dict(check, success=True, point_count=int(t.size),
+                message=f"Stored {t.size} {channel} points for {question_id}")
+
+  except Exception as e:
+    print(f"ERROR ingesting functional reading: {str(e)}")
+    return {'success': False, 'message': str(e)}
+
+
+@anvil.server.callable
+def get_functional_reading(inspection_id, sample_number, question_id, channel, max_points=MAX_DISPLAY_POINTS):
+  """
+  Get a stored reading series downsampled for display, with its limit envelope.
+
+  Returns:
+      dict: {'times': list, 'values': list, 'point_count': int, 'pass_fail': str,
+             'violations': int, 'limits': envelope or None} or None if not stored
+  """
+  row = app_tables.functional_readings.get(
+    inspection_id=inspection_id, sample_number=sample_number, question_id=question_id, channel=channel
+  )
+  if row is None:
+    return None
+
+  times, values = unpack_series(row['data'].get_bytes())
+  times, values = downsample(times, values, max(2, min(int(max_points), MAX_DISPLAY_POINTS)))
+
+  return {
+    'times': times.tolist(),
+    'values': values.tolist(),
+    'point_count': row['point_count'],
+    'pass_fail': row['limit_result'],
+    'violations': row['violations'],
+    'limits': _curve_limits(inspection_id, question_id, channel)
+  }
+
+
+@anvil.server.callable
+def list_functional_readings(inspection_id):
+  """
+  List the reading series stored for an inspection (metadata only, no points).
+
+  Returns:
+      list: dicts with sample_number, question_id, channel, point_count,
+            pass_fail, violations and captured
+  """
+  rows = app_tables.functional_readings.search(
+    q.fetch_only('sample_number', 'question_id', 'channel', 'point_count', 'limit_result', 'violations', 'captured'),
+    inspection_id=inspection_id
+  )
+  return [{
+    'sample_number': row['sample_number'],
+    'question_id': row['question_id'],
+    'channel': row['channel'],
+    'point_count': row['point_count'],
+    'pass_fail': row['limit_result'],
+    'violations': row['violations'],
+    'captured': row['captured']
+  } for row in rows]
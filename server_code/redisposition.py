@@ -0,0 +1,174 @@
+# Server Code → redisposition.py
+# Bulk re-evaluation of completed inspections after the disposition rules change.
+#
+# redispose_inspections streams inspect_summary in chunks. Reject metrics come
+# from the materialized inspect_counters rows (one lookup per chunk), or from a
+# recount of the stored results with recount=True. The current rules are
+# compiled once for the whole run. Changed summaries, and the quality rollups
+# they feed, are written in one transaction per chunk.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime
+from . import reject_counters
+from . import disposition_rules
+from .rollup_services import add_to_rollups
+from .summary_services import sample_size
+
+# Completed inspections evaluated (and written) per chunk
+CHUNK_SIZE = 200
+
+
+def _chunks(rows, size):
+  chunk = []
+  for row in rows:
+    chunk.append(row)
+    if len(chunk) == size:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+def _chunk_metrics(summaries, recount, dry_run=False):
+  """inspection_id -> reject metrics for one chunk of summaries (read-only when dry_run)."""
+  ids = [s['inspection_id'] for s in summaries]
+  fail_cells = {}
+  if not recount:
+    rows = app_tables.inspect_counters.search(
+      q.fetch_only('inspection_id', 'fail_cells', 'answered_cells'),
+      inspection_id=q.any_of(*ids)
+    )
+    for row in rows:
+      if row['answered_cells'] is not None:
+        fail_cells[row['inspection_id']] = row['fail_cells'] or {}
+
+  metrics = {}
+  for inspection_id in ids:
+    if inspection_id not in fail_cells:
+      # No usable counters (or a recount was asked for) - count from the results,
+      # storing the new counters unless this is a dry run
+      if dry_run:
+        fail_cells[inspection_id] = reject_counters.count_cells(inspection_id)['fail_cells']
+      else:
+        fail_cells[inspection_id] = reject_counters.rebuild_counters(inspection_id)['fail_cells'] or {}
+    metrics[inspection_id] = reject_counters.metrics_from_counters(fail_cells[inspection_id])
+  return metrics
+
+
+@tables.in_transaction
+def _write_changes(changes):
+  """
+  Write one chunk of re-evaluated summaries and move them between rollup buckets.
+
+  Only summaries the rollups are known to include (in_rollups) are taken out
+  of their old bucket; the others (completed before the rollups existed) are
+  added with their new values, so the rollup counts never go negative.
+  """
+  for summary, values in changes:
+    if summary['completed_date']:
+      if summary['in_rollups']:
+        add_to_rollups(summary['completed_date'], summary['series'], summary['prod_code'], summary['sample_qty'],
+                       summary['unit_rejects'], summary['all_rejects'], summary['disposition'], sign=-1)
+      add_to_rollups(summary['completed_date'], summary['series'], summary['prod_code'], summary['sample_qty'],
+                     values['unit_rejects'], values['all_rejects'], values['disposition'])
+      values = dict(values, in_rollups=True)
+    summary.update(**values)
+
+
+@anvil.server.background_task
+def redispose_inspections(date_from=None, date_to=None, recount=False, dry_run=False):
+  """
+  Re-evaluate the metrics and disposition of every completed inspection in a window.
+
+  Args:
+      date_from: Optional earliest completion date (inclusive)
+      date_to: Optional latest completion date (inclusive)
+      recount: Recount rejects from the results tables instead of trusting the counters
+      dry_run: Report what would change without writing
+
+  Returns:
+      dict: {'processed': int, 'changed': int, 'by_change': {'HOLD->REJECT': n, ...},
+             'seconds': float, 'per_second': float}
+  """
+  started = datetime.now()
+  rules = disposition_rules.compiled_rules()
+
+  filters = {}
+  if date_from and date_to:
+    filters['completed_date'] = q.between(date_from, date_to, max_inclusive=True)
+  elif date_from:
+    filters['completed_date'] = q.greater_than_or_equal_to(date_from)
+  elif date_to:
+    filters['completed_date'] = q.less_than_or_equal_to(date_to)
+
+  summaries = app_tables.inspect_summary.search(tables.order_by('completed_date'), **filters)
+
+  stats = {'processed': 0, 'changed': 0, 'by_change': {}}
+  for chunk in _chunks(summaries, CHUNK_SIZE):
+    metrics = _chunk_metrics(chunk, recount, dry_run)
+
+    changes = []
+    for summary in chunk:
+      m = metrics[summary['inspection_id']]
+      disposition, rule_id = disposition_rules.evaluate(
+        rules, m['unit_rejects'], m['all_rejects'],
+        series=summary['series'], sample_qty=sample_size(summary['sample_qty'])
+      )
+      values = {
+        'unit_rejects': m['unit_rejects'],
+        'all_rejects': m['all_rejects'],
+        'disposition': disposition,
+        'disposition_rule': rule_id
+      }
+      if any(summary[column] != value for column, value in values.items()):
+        changes.append((summary, values))
+        if summary['disposition'] != disposition:
+          change = f"{summary['disposition']}->{disposition}"
+          stats['by_change'][change] = stats['by_change'].get(change, 0) + 1
+
+    if changes and not dry_run:
+      _write_changes(changes)
+
+    stats['processed'] += len(chunk)
+    stats['changed'] += len(changes)
+    seconds = (datetime.now() - started).total_seconds()
+    stats['seconds'] = seconds
+    stats['per_second'] = stats['processed'] / seconds if seconds else 0
+    anvil.server.task_state['progress'] = dict(stats)
+
+  print(f"Re-disposition {'(dry run) ' if dry_run else ''}processed {stats['processed']} inspections, "
+        f"changed {stats['changed']} in {stats.get('seconds', 0):.1f}s "
+        f"({stats.get('per_second', 0):.0f}/s): {stats['by_change']}")
+  return stats
+
+
+@anvil.server.callable
+def start_redisposition(date_from=None, date_to=None, recount=False, dry_run=False):
+  """
+  Start redispose_inspections in the background.
+
+  Returns:
+      str: Background task ID, for get_redisposition_progress
+  """
+  task = anvil.server.launch_background_task('redispose_inspections', date_from, date_to, recount, dry_run)
+  return task.get_id()
+
+
+@anvil.server.callable
+def get_redisposition_progress(task_id):
+  """
+  Get the progress of a re-disposition run.
+
+  Returns:
+      dict: {'running': bool, 'progress': stats so far, 'result': final stats or None}
+  """
+  task = anvil.server.get_background_task(task_id)
+  running = task.is_running()
+  return {
+    'running': running,
+    'progress': task.get_state().get('progress'),
+    'result': None if running else task.get_return_value()
+  }
@@ -0,0 +1,208 @@
+# Server Code → reject_counters.py
+# Per-inspection reject and progress counters kept up to date by the section save paths.
+#
+# One inspect_counters row per inspection holds, for every section, the number
+# of failed and of answered questions per sample:
+#   fail_cells = {'document': {'lot': 1}, 'visual': {'3': 2}, 'dimension': {'3': 1}, ...}
+#   answered_cells = {'document': {'lot': 12}, 'visual': {'1': 8, '2': 8, '3': 8}, ...}
+# unit_rejects, all_rejects and section coverage are derived from that row
+# without reading results.
+# results_version is bumped by every save that writes a result, so cached
+# artifacts (reports) can be checked against it without reading results.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime
+
+# Key used for document results, which are per lot rather than per sample
+LOT_KEY = 'lot'
+
+SAMPLE_SECTIONS = ('visual', 'dimension', 'functional')
+
+
+def is_reject(pass_fail):
+  """True for answers that count as a reject ('Fail'/'Reject', any case)."""
+  return bool(pass_fail) and pass_fail.upper() in ['FAIL', 'REJECT']
+
+
+def is_answered(pass_fail):
+  """True for any real answer (not None, '' or 'Not Answered')."""
+  return pass_fail not in (None, '', 'Not Answered')
+
+
+def new_deltas():
+  """Empty counter changes for a save to accumulate into."""
+  return {'fail_cells': {}, 'answered_cells': {}}
+
+
+def add_cell_change(deltas, sample_key, old_pass_fail, new_pass_fail):
+  """
+  Record how one answer change moves the fail and answered counts of its sample.
+
+  Args:
+      deltas: Changes being accumulated by a save (see new_deltas)
+      sample_key: Sample number as a string, or LOT_KEY for documents
+      old_pass_fail: Stored answer before the write (None for a new row)
+      new_pass_fail: Answer being written
+  """
+  for column, test in (('fail_cells', is_reject), ('answered_cells', is_answered)):
+    change = int(test(new_pass_fail)) - int(test(old_pass_fail))
+    if change:
+      deltas[column][sample_key] = deltas[column].get(sample_key, 0) + change
+
+
+def ensure_counters(inspection_id):
+  """
+  Get the inspection's counters row for a save to add its changes to.
+
+  Inspections saved before counters existed are counted from their results
+  once. Call inside the save's transaction, before any result is written.
+  """
+  return _get_or_rebuild(inspection_id)
+
+
+def add_deltas(row, section, deltas):
+  """
+  Add the counter changes of one save to an inspection's counters row.
+
+  Call in the same transaction as the result writes the deltas were computed
+  from, so concurrent saves of a cell cannot both apply their change.
+  """
+  if not any(deltas.values()):
+    return
+
+  for column, changes in deltas.items():
+    by_section = dict(row[column] or {})
+    cells = dict(by_section.get(section, {}))
+
+    for sample_key, change in changes.items():
+      count = cells.get(sample_key, 0) + change
+      if count > 0:
+        cells[sample_key] = count
+      else:
+        cells.pop(sample_key, None)
+
+    by_section[section] = cells
+    # simpleObject columns are only saved when reassigned
+    row[column] = by_section
+  row['update_dt'] = datetime.now()
+
+
+def bump_results_version(row):
+  """Mark an inspection's results as changed. Call in the transaction that wrote them."""
+  row['results_version'] = (row['results_version'] or 0) + 1
+
+
+@tables.in_transaction
+def rebuild_counters(inspection_id):
+  """
+  Recount an inspection's failed and answered questions from its results tables.
+
+  Returns:
+      The inspect_counters row
+  """
+  return _rebuild(inspection_id)
+
+
+def count_cells(inspection_id):
+  """
+  Count an inspection's failed and answered questions from its results, without writing.
+
+  Returns:
+      dict: {'fail_cells': {...}, 'answered_cells': {...}}, as stored on the counters row
+  """
+  # Imported here because summary_services imports this module
+  from .summary_services import load_section_rows
+
+  counts = new_deltas()
+  for section, rows in load_section_rows(inspection_id).items():
+    deltas = new_deltas()
+    for result in rows:
+      key = LOT_KEY if section == 'document' else str(int(result['sample_number']))
+      add_cell_change(deltas, key, None, result['pass_fail'])
+    for column in counts:
+      counts[column][section] = deltas[column]
+  return counts
+
+
+def _rebuild(inspection_id):
+  counts = count_cells(inspection_id)
+  row = app_tables.inspect_counters.get(inspection_id=inspection_id)
+  if row is None:
+    row = app_tables.inspect_counters.add_row(inspection_id=inspection_id)
+  row['fail_cells'] = counts['fail_cells']
+  row['answered_cells'] = counts['answered_cells']
+  row['update_dt'] = datetime.now()
+  return row
+
+
+def _needs_rebuild(row):
+  # Rows created before progress counting have no answered_cells yet
+  return row is None or row['answered_cells'] is None
+
+
+def _get_or_rebuild(inspection_id):
+  row = app_tables.inspect_counters.get(inspection_id=inspection_id)
+  if _needs_rebuild(row):
+    row = _rebuild(inspection_id)
+  return row
+
+
+def metrics_from_counters(fail_cells):
+  """
+  Derive reject metrics from a fail_cells dict.
+
+  Returns:
+      dict: {'unit_rejects': int, 'all_rejects': int, 'section_rejects': dict, 'failed_samples': list}
+  """
+  section_rejects = {section: sum(cells.values()) for section, cells in fail_cells.items()}
+
+  # A sample failing in several sections is still one rejected unit
+  failed_samples = set()
+  for section in SAMPLE_SECTIONS:
+    failed_samples |= set(fail_cells.get(section, {}))
+
+  return {
+    'unit_rejects': len(failed_samples),
+    'all_rejects': sum(section_rejects.values()),
+    'section_rejects': section_rejects,
+    'failed_samples': sorted(int(s) for s in failed_samples)
+  }
+
+
+def reject_metrics(inspection_id):
+  """
+  Read an inspection's reject metrics from its counters row (safe inside a transaction).
+
+  Returns:
+      dict: {'unit_rejects': int, 'all_rejects': int, 'section_rejects': dict, 'failed_samples': list}
+  """
+  row = _get_or_rebuild(inspection_id)
+  return metrics_from_counters(row['fail_cells'] or {})
+
+
+@anvil.server.callable
+def get_reject_metrics(inspection_id):
+  """
+  Get the current reject metrics of an inspection without rescanning its results.
+
+  Args:
+      inspection_id: The inspection ID
+
+  Returns:
+      dict: {'unit_rejects': int, 'all_rejects': int, 'section_rejects': dict, 'failed_samples': list}
+  """
+  return reject_metrics(inspection_id)
+
+
+def answered_counts(inspection_id):
+  """
+  Read how many questions have been answered, per section and sample.
+
+  Returns:
+      dict: {'document': {'lot': 12}, 'visual': {'1': 8, ...}, ...}
+  """
+  row = _get_or_rebuild(inspection_id)
+  return row['answered_cells'] or {}
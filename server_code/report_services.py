@@ -0,0 +1,231 @@
+# Server Code → report_services.py
+# Full inspection reports (HTML, with photo thumbnails), rendered once and cached.
+#
+# A report is rendered in a background task from the stored results and kept in
+# inspection_reports together with the version it was built from: the
+# inspection's results_version (bumped by every result save, on
+# inspect_counters), its header update time and its disposition. Checking the
+# cache is three row lookups. Download, email and re-send reuse the cached
+# file until a result, the header or the disposition changes.
+
+import anvil
+import anvil.image
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime
+import base64
+import html
+from .reject_counters import is_reject
+from .summary_services import SECTIONS, QUESTION_TABLES
+from .email_services import queue_email, split_addresses
+
+STATUS_RENDERING = 'rendering'
+STATUS_READY = 'ready'
+
+# Longest side of embedded photo thumbnails, in pixels
+THUMBNAIL_SIZE = 240
+
+# Section -> (notes column, photo column)
+RESULT_COLUMNS = {
+  'document': ('note', 'photo_media'),
+  'visual': ('notes', 'photo'),
+  'dimension': ('notes', 'photo'),
+  'functional': ('notes', 'photo'),
+}
+
+
+def report_version(inspection_id):
+  """Version a cached report must match: results version, header update time and disposition."""
+  counters = app_tables.inspect_counters.get(inspection_id=inspection_id)
+  header = app_tables.inspect_head.get(id_head=inspection_id)
+  summary = app_tables.inspect_summary.get(inspection_id=inspection_id)
+  results = (counters['results_version'] if counters else None) or 0
+  updated = header['update_dt'].isoformat() if header and header['update_dt'] else ''
+  disposition = (summary['disposition'] if summary else None) or ''
+  return f"{results}:{updated}:{disposition}"
+
+
+def _thumbnail(media):
+  """Photo as an inline <img>, or '' if it cannot be read."""
+  try:
+    thumb = anvil.image.generate_thumbnail(media, THUMBNAIL_SIZE)
+    data = base64.b64encode(thumb.get_bytes()).decode('ascii')
+    return f'<img src="data:{thumb.content_type};base64,{data}">'
+  except Exception as e:
+    print(f"Could not thumbnail photo: {str(e)}")
+    return ''
+
+
+def render_report_html(inspection_id):
+  """Build the report HTML from the header, summary and failed results."""
+  esc = lambda value: html.escape(str(value if value is not None else ''))
+  header = app_tables.inspect_head.get(id_head=inspection_id)
+  summary = app_tables.inspect_summary.get(inspection_id=inspection_id)
+  series = header['series'] if header else None
+
+  parts = [
+    "<html><head><meta charset='utf-8'><style>",
+    "body{font-family:sans-serif} table{border-collapse:collapse;margin-bottom:16px}",
+    "td,th{border:1px solid #ccc;padding:4px 8px;vertical-align:top} img{max-width:240px}",
+    "</style></head><body>",
+    f"<h1>Incoming Inspection {esc(inspection_id)}</h1>",
+    "<table>"
+  ]
+  if header:
+    for label, value in (("Inspection Date", header['ins_date']),
+                         ("Purchase Order", f"{header['po_numb']}-{header['rel_numb']}"),
+                         ("Series", header['series']), ("Code", header['prod_code']),
+                         ("Lot Qty", header['lot_qty']), ("Sample Qty", header['sam_qty'])):
+      parts.append(f"<tr><th>{label}</th><td>{esc(value)}</td></tr>")
+  if summary:
+    for label, value in (("Unit Rejects", summary['unit_rejects']), ("Total Rejects", summary['all_rejects']),
+                         ("Disposition", summary['disposition']), ("Completed", summary['completed_date'])):
+      parts.append(f"<tr><th>{label}</th><td>{esc(value)}</td></tr>")
+  parts.append("</table>")
+
+  for section, (table, label) in SECTIONS.items():
+    notes_column, photo_column = RESULT_COLUMNS[section]
+    failed = [r for r in table.search(inspection_id=inspection_id) if is_reject(r['pass_fail'])]
+    parts.append(f"<h2>{esc(label)}</h2>")
+    if not failed:
+      parts.append("<p>No rejects.</p>")
+      continue
+
+    questions = QUESTION_TABLES[section].search() if section == 'document' else \
+      QUESTION_TABLES[section].search(product_series=series)
+    texts = {question['question_id']: question['question_text'] for question in questions}
+
+    failed.sort(key=lambda r: ((r['sample_number'] or 0) if section != 'document' else 0, r['question_id']))
+    parts.append("<table><tr><th>Sample</th><th>Question</th><th>Result</th><th>Notes</th><th>Photo</th></tr>")
+    for result in failed:
+      sample = 'Lot' if section == 'document' else result['sample_number']
+      photo = _thumbnail(result[photo_column]) if result[photo_column] else ''
+      parts.append(
+        f"<tr><td>{esc(sample)}</td>"
+        f"<td>{esc(result['question_id'])}. {esc(texts.get(result['question_id']))}</td>"
+        f"<td>{esc(result['pass_fail'])}</td><td>{esc(result[notes_column])}</td><td>{photo}</td></tr>"
+      )
+    parts.append("</table>")
+
+  parts.append(f"<p>Generated {datetime.now():%Y-%m-%d %H:%M}</p></body></html>")
+  return "".join(parts)
+
+
+@tables.in_transaction
+def _claim_render(inspection_id, version):
+  """Mark a report as rendering. Returns False if it is already cached or rendering for this version."""
+  row = app_tables.inspection_reports.get(inspection_id=inspection_id)
+  if row is None:
+    app_tables.inspection_reports.add_row(inspection_id=inspection_id, version=version, status=STATUS_RENDERING)
+    return True
+  if row['version'] == version:
+    return False
+  row.update(version=version, status=STATUS_RENDERING)
+  return True
+
+
+@anvil.server.background_task
+def render_inspection_report(inspection_id, version, email_to=None, message=None):
+  """
+  Render and cache a report, then queue any email that was waiting for it.
+
+  Args:
+      inspection_id: The inspection ID
+      version: report_version the report is built from
+      email_to: Optional list of addresses to send the report to once rendered
+      message: Optional text for that email
+  """
+  try:
+    content = render_report_html(inspection_id)
+  except Exception:
+    # Let the next request try again instead of waiting on a render that died
+    row = app_tables.inspection_reports.get(inspection_id=inspection_id)
+    if row and row['version'] == version:
+      row.update(version=None, status=None)
+    raise
+
+  report = anvil.BlobMedia('text/html', content.encode('utf-8'), name=f"{inspection_id}_report.html")
+
+  row = app_tables.inspection_reports.get(inspection_id=inspection_id)
+  # A newer save may have started another render meanwhile - only store a current report
+  if row and row['version'] == version:
+    row.update(report=report, status=STATUS_READY, rendered=datetime.now())
+  print(f"Rendered report for {inspection_id} (version {version})")
+
+  if email_to:
+    _queue_report_email(inspection_id, email_to, message, report)
+
+
+def _queue_report_email(inspection_id, email_to, message, report):
+  queue_email(email_to,
+              subject=f"Incoming Inspection {inspection_id}",
+              text=f"\n  {message or ''}\n\n  The full inspection report is attached.\n\n  Thanks,\n  Hub Inspections\n",
+              attachment=report)
+
+
+def cached_report(inspection_id):
+  """
+  The cached report if it matches the current results, else None.
+
+  Returns:
+      tuple: (report Media or None, current version)
+  """
+  version = report_version(inspection_id)
+  row = app_tables.inspection_reports.get(inspection_id=inspection_id)
+  if row and row['version'] == version and row['status'] == STATUS_READY:
+    return row['report'], version
+  return None, version
+
+
+@anvil.server.callable
+def get_inspection_report(inspection_id):
+  """
+  Get the report for download, starting a render if the cache is out of date.
+
+  Returns:
+      dict: {'ready': True, 'report': Media} or {'ready': False, 'message': str}
+  """
+  try:
+    report, version = cached_report(inspection_id)
+    if report:
+      return {'ready': True, 'report': report}
+
+    if _claim_render(inspection_id, version):
+      anvil.server.launch_background_task('render_inspection_report', inspection_id, version)
+    return {'ready': False, 'message': 'The report is being prepared. Please try again in a moment.'}
+
+  except Exception as e:
+    print(f"ERROR getting inspection report: {str(e)}")
+    return {'ready': False, 'message': str(e)}
+
+
+@anvil.server.callable
+def email_inspection_report(inspection_id, emails, message=''):
+  """
+  Email the full report, reusing the cached file when it is current.
+
+  Returns immediately; the email is queued now, or once the report is rendered.
+
+  Returns:
+      dict: {'success': bool, 'message': str}
+  """
+  try:
+    email_list = split_addresses(emails)
+    if not email_list:
+      return {'success': False, 'message': 'Enter at least one email address'}
+
+    report, version = cached_report(inspection_id)
+    if report:
+      _queue_report_email(inspection_id, email_list, message, report)
+    else:
+      # Render now whether or not another render is running; this one sends the email
+      _claim_render(inspection_id, version)
+      anvil.server.launch_background_task('render_inspection_report', inspection_id, version, email_list, message)
+
+    return {'success': True, 'message': f'Report email queued for {len(email_list)} recipient(s)'}
+
+  except Exception as e:
+    print(f"ERROR emailing inspection report: {str(e)}")
+    return {'success': False, 'message': str(e)}
@@ -0,0 +1,62 @@
+# Server Code → result_versions.py
+# Row version stamps for the *_results tables (optimistic concurrency).
+#
+# Every result row carries a 'row_version' number that is bumped on each write.
+# Clients send back the version they last saw for each cell; a save only writes
+# cells whose stored version still matches, and reports the others as conflicts.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+
+
+def row_version(row):
+  """Stored version of a result row (rows written before versioning count as 0)."""
+  return row['row_version'] or 0
+
+
+def is_stale(row, result):
+  """
+  True when the client saw an older version of this cell than the one stored.
+
+  Results without a 'version' key come from callers that do not track versions
+  and are written blindly, as before.
+  """
+  if 'version' not in result:
+    return False
+  return row_version(row) != (result.get('version') or 0)
+
+
+def same_answer(row, result, notes_column):
+  """True when the stored answer already matches what the client wants to save."""
+  return (row['pass_fail'] == result.get('pass_fail', 'Not Answered') and
+          (row[notes_column] or '') == (result.get(notes_column) or ''))
+
+
+def conflict(sample_key, question_id, row, result, notes_column, answer_columns=()):
+  """
+  Describe a stale cell: the stored answer and the one the client tried to save.
+
+  The stored answer includes answer_columns (photo, measured value), so the
+  client can replace the whole cell rather than mix its own fields into it.
+  """
+  server = {
+    'pass_fail': row['pass_fail'],
+    notes_column: row[notes_column],
+    'inspected_by': row['inspected_by'],
+    'update_datetime': row['update_datetime'],
+    'version': row_version(row)
+  }
+  for column in answer_columns:
+    server[column] = row[column]
+
+  return {
+    'sample': sample_key,
+    'question_id': question_id,
+    'server': server,
+    'client': {
+      'pass_fail': result.get('pass_fail'),
+      notes_column: result.get(notes_column)
+    }
+  }
@@ -0,0 +1,154 @@
+# Server Code → rollup_services.py
+# Pre-aggregated quality rollups for the reject-rate dashboard.
+#
+# complete_inspection adds each inspection to one daily and one monthly
+# quality_rollups row for its series and product code, and sets in_rollups on
+# its summary so later corrections know the rollups include it. Dashboard charts are
+# served from those rows only - inspect_summary and the results tables are
+# not read.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime
+
+PERIOD_DAY = 'day'
+PERIOD_MONTH = 'month'
+
+# Counters kept on every rollup row
+ROLLUP_COUNTERS = ('inspections', 'samples', 'unit_rejects', 'all_rejects',
+                   'accept_count', 'hold_count', 'reject_count')
+
+# Disposition -> rollup counter
+DISPOSITION_COUNTERS = {
+  'ACCEPT': 'accept_count',
+  'HOLD': 'hold_count',
+  'REJECT': 'reject_count',
+}
+
+# Rollup columns the dashboard may group by
+GROUP_BY_COLUMNS = ('series', 'prod_code')
+
+
+def period_key(period_type, when):
+  """Rollup bucket for a date: 'YYYY-MM-DD' for days, 'YYYY-MM' for months."""
+  return when.strftime('%Y-%m-%d' if period_type == PERIOD_DAY else '%Y-%m')
+
+
+def _to_int(value):
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return 0
+
+
+def add_to_rollups(completed_date, series, prod_code, sample_qty, unit_rejects, all_rejects, disposition, sign=1):
+  """
+  Add one completed inspection to its daily and monthly rollup rows.
+
+  Call inside the transaction that creates the summary record. Pass sign=-1
+  to take an inspection back out (e.g. before re-disposing it).
+  """
+  changes = {
+    'inspections': 1,
+    'samples': _to_int(sample_qty),
+    'unit_rejects': _to_int(unit_rejects),
+    'all_rejects': _to_int(all_rejects),
+  }
+  if disposition in DISPOSITION_COUNTERS:
+    changes[DISPOSITION_COUNTERS[disposition]] = 1
+
+  for period_type in (PERIOD_DAY, PERIOD_MONTH):
+    key = {
+      'period_type': period_type,
+      'period_key': period_key(period_type, completed_date),
+      'series': series or '',
+      'prod_code': prod_code or ''
+    }
+    row = app_tables.quality_rollups.get(**key)
+    if row is None:
+      row = app_tables.quality_rollups.add_row(**key, **{c: 0 for c in ROLLUP_COUNTERS})
+
+    for counter, change in changes.items():
+      row[counter] = (row[counter] or 0) + sign * change
+    row['update_dt'] = datetime.now()
+
+
+@anvil.server.callable
+def get_reject_rate_dashboard(period_type=PERIOD_MONTH, start_key=None, end_key=None,
+                              series=None, prod_code=None, group_by='series'):
+  """
+  Reject-rate chart data served from the rollup rows.
+
+  Args:
+      period_type: 'day' or 'month'
+      start_key: Optional first period ('YYYY-MM-DD' or 'YYYY-MM', inclusive)
+      end_key: Optional last period (inclusive)
+      series: Optional product series filter
+      prod_code: Optional product code filter
+      group_by: 'series', 'prod_code' or None for one line over everything
+
+  Returns:
+      list: One dict per (period_key, group), ordered by period, with the rollup
+            counters plus unit_reject_rate (unit_rejects / samples) and
+            reject_disposition_rate (reject_count / inspections)
+  """
+  if group_by and group_by not in GROUP_BY_COLUMNS:
+    raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_COLUMNS)} or None")
+
+  filters = {'period_type': period_type}
+  if series:
+    filters['series'] = series
+  if prod_code:
+    filters['prod_code'] = prod_code
+  if start_key and end_key:
+    filters['period_key'] = q.between(start_key, end_key, max_inclusive=True)
+  elif start_key:
+    filters['period_key'] = q.greater_than_or_equal_to(start_key)
+  elif end_key:
+    filters['period_key'] = q.less_than_or_equal_to(end_key)
+
+  points = {}
+  for row in app_tables.quality_rollups.search(**filters):
+    group = row[group_by] if group_by else 'All'
+    point = points.setdefault((row['period_key'], group), dict(
+      {'period_key': row['period_key'], 'group': group},
+      **{c: 0 for c in ROLLUP_COUNTERS}
+    ))
+    for counter in ROLLUP_COUNTERS:
+      point[counter] += row[counter] or 0
+
+  results = []
+  for key in sorted(points):
+    point = points[key]
+    point['unit_reject_rate'] = point['unit_rejects'] / point['samples'] if point['samples'] else 0
+    point['reject_disposition_rate'] = point['reject_count'] / point['inspections'] if point['inspections'] else 0
+    results.append(point)
+
+  return results
+
+
+@anvil.server.background_task
+def rebuild_quality_rollups():
+  """
+  Recreate all rollup rows from inspect_summary, and mark each summary
+  with whether the rollups now include it (in_rollups).
+  Run once after deploying, or to repair the rollups.
+  """
+  with tables.batch_delete:
+    for row in app_tables.quality_rollups.search():
+      row.delete()
+
+  count = 0
+  for summary in app_tables.inspect_summary.search():
+    included = bool(summary['completed_date'])
+    if included:
+      add_to_rollups(summary['completed_date'], summary['series'], summary['prod_code'],
+                     summary['sample_qty'], summary['unit_rejects'], summary['all_rejects'],
+                     summary['disposition'])
+      count += 1
+    if summary['in_rollups'] != included:
+      summary['in_rollups'] = included
+
+  print(f"Rebuilt quality rollups from {count} completed inspections")
@@ -0,0 +1,117 @@
+# Server Code → save_requests.py
+# Short-lived record of completed save requests, so a retried save is not run twice.
+#
+# The client sends a request ID with every save_*_inspection_results call and
+# reuses it when the user clicks again after a timeout. The first call claims
+# the ID; once it succeeds its outcome is stored and any retry with the same ID
+# gets that outcome back instead of rewriting every row.
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+from datetime import datetime, timedelta
+
+# How long a completed request ID is remembered
+REQUEST_TTL = timedelta(hours=1)
+
+# A claim still 'running' after this long belongs to a save that died
+# (e.g. the call timed out); a retry with the same ID takes it over
+RUNNING_TIMEOUT = timedelta(minutes=3)
+
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+
+
+@tables.in_transaction
+def claim(request_id, section, inspection_id):
+  """
+  Claim a save request ID before doing the work.
+
+  Args:
+      request_id: Client-generated ID (None disables de-duplication)
+      section: 'document', 'visual', 'dimension' or 'functional'
+      inspection_id: The inspection ID
+
+  Returns:
+      None if the caller should run the save, otherwise the response to return
+      straight away (the cached outcome, or an "in progress" message)
+  """
+  if not request_id:
+    return None
+
+  row = app_tables.save_requests.get(request_id=request_id)
+  if row and row['created'] < datetime.now() - REQUEST_TTL:
+    row.delete()
+    row = None
+
+  if row is None:
+    app_tables.save_requests.add_row(
+      request_id=request_id,
+      section=section,
+      inspection_id=inspection_id,
+      status=STATUS_RUNNING,
+      created=datetime.now()
+    )
+    return None
+
+  if row['status'] == STATUS_DONE:
+    print(f"Save request {request_id} already completed - returning cached outcome")
+    return row['outcome']
+
+  if row['created'] < datetime.now() - RUNNING_TIMEOUT:
+    print(f"Save request {request_id} was abandoned - running it again")
+    row.update(section=section, inspection_id=inspection_id, created=datetime.now())
+    return None
+
+  return {
+    'success': False,
+    'in_progress': True,
+    'message': 'This save is still being processed. Please wait a moment and try again.'
+  }
+
+
+def finish(request_id, outcome):
+  """
+  Store the outcome of a claimed save request.
+
+  Successful outcomes are kept for REQUEST_TTL; failed ones release the claim
+  so a retry runs the save again.
+  """
+  if not request_id:
+    return
+
+  row = app_tables.save_requests.get(request_id=request_id)
+  if row is None:
+    return
+
+  if outcome.get('success'):
+    row['outcome'] = _json_safe(outcome)
+    row['status'] = STATUS_DONE
+  else:
+    row.delete()
+
+
+def _json_safe(value):
+  """Convert dates in an outcome so it can be stored in a simpleObject column."""
+  if isinstance(value, dict):
+    return {k: _json_safe(v) for k, v in value.items()}
+  if isinstance(value, (list, tuple)):
+    return [_json_safe(v) for v in value]
+  if hasattr(value, 'isoformat'):
+    return value.isoformat()
+  return value
+
+
+@anvil.server.background_task
+def purge_save_requests():
+  """
+  Delete expired save request records.
+  Runs hourly (scheduled_tasks in anvil.yaml).
+  """
+  cutoff = datetime.now() - REQUEST_TTL
+  count = 0
+  for row in app_tables.save_requests.search(created=q.less_than(cutoff)):
+    row.delete()
+    count += 1
+  print(f"Purged {count} expired save requests")
@@ -0,0 +1,179 @@
+# Server Code → spc_services.py
+# Statistical process control for measured dimension characteristics.
+#
+# A dimension question with a nominal value is a measured characteristic:
+#   USL = nominal + tol_plus, LSL = nominal - tol_minus
+# Measurements stored in dimension_results.measured_value are loaded in
+# inspection order and evaluated as one NumPy array per characteristic
+# (individuals chart, sigma from the average moving range).
+
+import anvil.server
+import anvil.tables as tables
+import anvil.tables.query as q
+from anvil.tables import app_tables
+import numpy as np
+
+# d2 constant for moving ranges of two consecutive values
+D2 = 1.128
+
+# Consecutive points on one side of the centre line that signal a shift
+RUN_LENGTH = 8
+
+# Inspections per results-table lookup
+ID_CHUNK = 500
+
+
+def characteristic_stats(values, nominal=None, tol_plus=None, tol_minus=None):
+  """
+  Compute SPC statistics for one characteristic.
+
+  Args:
+      values: Measurements in production order
+      nominal: Nominal value (None if the characteristic has no specification)
+      tol_plus: Upper tolerance (USL = nominal + tol_plus)
+      tol_minus: Lower tolerance (LSL = nominal - tol_minus)
+
+  Returns:
+      dict: count, mean, sigma (overall), sigma_within, ucl, lcl, usl, lsl,
+            cp, cpk, pp, ppk, out_of_spec, beyond_limits (indices of points
+            outside the control limits) and run_violations (indices ending a
+            run of RUN_LENGTH points on one side of the mean)
+  """
+  x = np.asarray(values, dtype=float)
+  n = x.size
+  stats = {'count': int(n)}
+  if n < 2:
+    return stats
+
+  mean = x.mean()
+  sigma = x.std(ddof=1)
+  sigma_within = np.abs(np.diff(x)).mean() / D2
+
+  ucl = mean + 3 * sigma_within
+  lcl = mean - 3 * sigma_within
+  beyond = np.flatnonzero((x > ucl) | (x < lcl))
+
+  # Runs: a window of RUN_LENGTH points all above (or all below) the mean
+  side = np.sign(x - mean)
+  window = np.ones(RUN_LENGTH)
+  run_sum = np.convolve(side, window, mode='valid') if n >= RUN_LENGTH else np.array([])
+  runs = np.flatnonzero(np.abs(run_sum) == RUN_LENGTH) + RUN_LENGTH - 1
+
+  stats.update({
+    'mean': float(mean),
+    'sigma': float(sigma),
+    'sigma_within': float(sigma_within),
+    'ucl': float(ucl),
+    'lcl': float(lcl),
+    'beyond_limits': beyond.tolist(),
+    'run_violations': runs.tolist()
+  })
+
+  if nominal is not None:
+    usl = nominal + (tol_plus or 0)
+    lsl = nominal - (tol_minus or 0)
+    stats.update({
+      'usl': usl,
+      'lsl': lsl,
+      'out_of_spec': int(np.count_nonzero((x > usl) | (x < lsl))),
+      'cp': _capability(usl - lsl, 6 * sigma_within),
+      'cpk': _capability(min(usl - mean, mean - lsl), 3 * sigma_within),
+      'pp': _capability(usl - lsl, 6 * sigma),
+      'ppk': _capability(min(usl - mean, mean - lsl), 3 * sigma)
+    })
+
+  return stats
+
+
+def _capability(spread, sigma_spread):
+  return float(spread / sigma_spread) if sigma_spread > 0 else None
+
+
+def load_measurements(product_series, question_id=None, date_from=None, date_to=None):
+  """
+  Load measured values for a product series in inspection order.
+
+  Returns:
+      dict: question_id -> list of measurements, oldest inspection first
+            and in sample order within an inspection
+  """
+  filters = {'series': product_series}
+  if date_from and date_to:
+    filters['ins_date'] = q.between(date_from, date_to, max_inclusive=True)
+  elif date_from:
+    filters['ins_date'] = q.greater_than_or_equal_to(date_from)
+  elif date_to:
+    filters['ins_date'] = q.less_than_or_equal_to(date_to)
+
+  headers = app_tables.inspect_head.search(q.fetch_only('id_head'), tables.order_by('ins_date'), **filters)
+  ids = [h['id_head'] for h in headers if h['id_head']]
+  order = {inspection_id: i for i, inspection_id in enumerate(ids)}
+
+  result_filters = {'measured_value': q.not_(None)}
+  if question_id:
+    result_filters['question_id'] = question_id
+
+  # Columns: inspection order, sample number, measurement
+  by_question = {}
+  for start in range(0, len(ids), ID_CHUNK):
+    rows = app_tables.dimension_results.search(
+      q.fetch_only('inspection_id', 'sample_number', 'question_id', 'measured_value'),
+      inspection_id=q.any_of(*ids[start:start + ID_CHUNK]),
+      **result_filters
+    )
+    for row in rows:
+      by_question.setdefault(row['question_id'], []).append(
+        (order[row['inspection_id']], row['sample_number'] or 0, row['measured_value'])
+      )
+
+  measurements = {}
+  for qid, points in by_question.items():
+    data = np.array(points, dtype=float)
+    data = data[np.lexsort((data[:, 1], data[:, 0]))]
+    measurements[qid] = data[:, 2]
+  return measurements
+
+
+@anvil.server.callable
+def get_dimension_spc(product_series, question_id=None, date_from=None, date_to=None):
+  """
+  Get SPC statistics for the measured dimension characteristics of a product series.
+
+  Args:
+      product_series: The product series
+      question_id: Optional single characteristic
+      date_from: Optional earliest inspection date (inclusive)
+      date_to: Optional latest inspection date (inclusive)
+
+  Returns:
+      dict: {'success': bool, 'characteristics': list of dicts with question_id,
+             question_text, nominal, tol_plus, tol_minus, unit and the
+             statistics from characteristic_stats}
+  """
+  try:
+    specs = {}
+    for question in app_tables.dimension_questions.search(product_series=product_series):
+      specs[question['question_id']] = question
+
+    characteristics = []
+    for qid, values in sorted(load_measurements(product_series, question_id, date_from, date_to).items()):
+      spec = specs.get(qid)
+      nominal = spec['nominal'] if spec else None
+      tol_plus = spec['tol_plus'] if spec else None
+      tol_minus = spec['tol_minus'] if spec else None
+      characteristic = {
+        'question_id': qid,
+        'question_text': spec['question_text'] if spec else None,
+        'nominal': nominal,
+        'tol_plus': tol_plus,
+        'tol_minus': tol_minus,
+        'unit': spec['unit'] if spec else None
+      }
+      characteristic.update(characteristic_stats(values, nominal, tol_plus, tol_minus))
+      characteristics.append(characteristic)
+
+    return {'success': True, 'characteristics': characteristics}
+
+  except Exception as e:
+    print(f"ERROR computing dimension SPC: {str(e)}")
+    return {'success': False, 'message': str(e), 'characteristics': []}
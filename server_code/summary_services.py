@@ -5,7 +5,161 @@ import anvil.tables as tables
 import anvil.tables.query as q
 from anvil.tables import app_tables
 import anvil.server
-from datetime import datetime
+from datetime import datetime, timedelta
+from . import reject_counters
+from .reject_counters import is_reject
+from .rollup_services import add_to_rollups
+from . import disposition_rules
+
+STATUS_COMPLETED = 'Completed'
+
+# Largest page get_completed_inspections_page will return
+MAX_PAGE_SIZE = 100
+
+# Section name -> (results table, label used in validation messages)
+SECTIONS = {
+  'document': (app_tables.document_results, "Document Check"),
+  'visual': (app_tables.visual_results, "Visual Inspection"),
+  'dimension': (app_tables.dimension_results, "Dimension Check"),
+  'functional': (app_tables.functional_results, "Functional Check"),
+}
+
+
+def sample_size(sample_qty):
+  """Sample quantity as a number (it is stored as text), or None if not numeric."""
+  try:
+    return int(sample_qty)
+  except (TypeError, ValueError):
+    return None
+
+
+def load_section_rows(inspection_id):
+  """
+  Read the result rows of every section of an inspection, one search per table.
+  
+  Args:
+      inspection_id: The inspection ID
+  
+  Returns:
+      dict: {'document': [rows], 'visual': [rows], 'dimension': [rows], 'functional': [rows]}
+  """
+  return {
+    section: list(table.search(inspection_id=inspection_id))
+    for section, (table, _) in SECTIONS.items()
+  }
+
+
+# Section name -> active questions table
+QUESTION_TABLES = {
+  'document': app_tables.document_questions,
+  'visual': app_tables.visual_questions,
+  'dimension': app_tables.dimension_questions,
+  'functional': app_tables.functional_questions,
+}
+
+# Question counts are cached per process and re-read after this long,
+# so question edits show up in progress within a few minutes
+QUESTION_COUNT_TTL = timedelta(minutes=5)
+
+# (section, series) -> (count, read at)
+_question_counts = {}
+
+
+def has_results(table, inspection_id):
+  """True as soon as one result row is found - does not read the rest of the table."""
+  for _ in table.search(q.fetch_only('inspection_id'), inspection_id=inspection_id):
+    return True
+  return False
+
+
+def find_missing_sections(inspection_id):
+  """List the labels of sections that have no saved results."""
+  return [label for section, (table, label) in SECTIONS.items() if not has_results(table, inspection_id)]
+
+
+def count_questions(section, product_series):
+  """
+  Number of active questions in a section that must be answered (optional
+  questions are left out; document questions apply to every series).
+  """
+  key = (section, None if section == 'document' else product_series)
+  cached = _question_counts.get(key)
+  now = datetime.now()
+  if cached and now - cached[1] < QUESTION_COUNT_TTL:
+    return cached[0]
+
+  table = QUESTION_TABLES[section]
+  if section == 'document':
+    questions = table.search(q.fetch_only('is_optional'), is_active=True)
+  else:
+    questions = table.search(q.fetch_only('is_optional'), product_series=product_series, is_active=True)
+  count = sum(1 for question in questions if not question['is_optional'])
+  _question_counts[key] = (count, now)
+  return count
+
+
+def find_incomplete_sections(inspection_id, series, sample_qty):
+  """
+  List the sections with required answers still missing, read from the
+  progress counters (no results are read).
+
+  A sample counts as complete once it has as many answers as the section has
+  required questions, as in get_inspection_progress.
+
+  Returns:
+      list: "<label>: <n> answers missing" for each incomplete section
+  """
+  answered = reject_counters.answered_counts(inspection_id)
+  samples = sample_size(sample_qty) or 0
+
+  incomplete = []
+  for section, (_, label) in SECTIONS.items():
+    question_count = count_questions(section, series)
+    keys = [reject_counters.LOT_KEY] if section == 'document' else [str(n) for n in range(1, samples + 1)]
+    cells = answered.get(section, {})
+    missing = sum(max(0, question_count - cells.get(key, 0)) for key in keys)
+    if missing:
+      incomplete.append(f"{label}: {missing} answers missing")
+  return incomplete
+
+
+@anvil.server.callable
+def get_inspection_progress(inspection_id):
+  """
+  Report how far each section of an inspection has been answered.
+  
+  Answered counts come from the progress counters kept by the section saves,
+  so no results are read.
+  
+  Args:
+      inspection_id: The inspection ID
+  
+  Returns:
+      dict: {section: {'label': str, 'samples_answered': int, 'samples_expected': int,
+                       'questions_answered': int, 'questions_expected': int}}
+  """
+  header = app_tables.inspect_head.get(id_head=inspection_id)
+  series = header['series'] if header else None
+  sample_qty = (sample_size(header['sam_qty']) if header else None) or 0
+  answered = reject_counters.answered_counts(inspection_id)
+
+  progress = {}
+  for section, (_, label) in SECTIONS.items():
+    question_count = count_questions(section, series)
+    samples_expected = 1 if section == 'document' else sample_qty
+    cells = answered.get(section, {})
+
+    progress[section] = {
+      'label': label,
+      # A sample counts once every question in it has been answered
+      'samples_answered': sum(1 for count in cells.values() if question_count and count >= question_count),
+      'samples_expected': samples_expected,
+      'questions_answered': sum(cells.values()),
+      'questions_expected': question_count * samples_expected
+    }
+
+  return progress
+
 
 @anvil.server.callable
 def validate_inspection_complete(inspection_id):
@@ -15,46 +169,33 @@ def validate_inspection_complete(inspection_id):
   Args:
       inspection_id: The inspection ID to validate
   
+  Each section is probed for a single result row, so the check does not grow
+  with the size of the inspection. Per-section coverage comes from
+  get_inspection_progress.
+  
   Returns:
-      dict: {'valid': bool, 'message': str, 'missing_sections': list}
+      dict: {'valid': bool, 'message': str, 'missing_sections': list, 'coverage': dict}
   """
   print(f"=== VALIDATING INSPECTION {inspection_id} ===")
 
-  missing_sections = []
-
-  # Check Document Results
-  doc_results = app_tables.document_results.search(inspection_id=inspection_id)
-  if len(doc_results) == 0:
-    missing_sections.append("Document Check")
-
-  # Check Visual Results
-  visual_results = app_tables.visual_results.search(inspection_id=inspection_id)
-  if len(visual_results) == 0:
-    missing_sections.append("Visual Inspection")
-
-  # Check Dimension Results
-  dimension_results = app_tables.dimension_results.search(inspection_id=inspection_id)
-  if len(dimension_results) == 0:
-    missing_sections.append("Dimension Check")
-
-  # Check Functional Results
-  functional_results = app_tables.functional_results.search(inspection_id=inspection_id)
-  if len(functional_results) == 0:
-    missing_sections.append("Functional Check")
+  missing_sections = find_missing_sections(inspection_id)
+  coverage = get_inspection_progress(inspection_id)
 
   if missing_sections:
     message = "\n".join([f"• {section}" for section in missing_sections])
     return {
       'valid': False,
       'message': message,
-      'missing_sections': missing_sections
+      'missing_sections': missing_sections,
+      'coverage': coverage
     }
 
   print(f"Validation passed - all sections complete")
   return {
     'valid': True,
     'message': 'All sections complete',
-    'missing_sections': []
+    'missing_sections': [],
+    'coverage': coverage
   }
 
 
@@ -64,10 +205,16 @@ def complete_inspection(inspection_id, inspection_date, po_numb, rel_numb, serie
   Complete an inspection by creating summary record and marking all results as complete.
   
   This function:
-  1. Calculates rejection metrics (unit_rejects and all_rejects)
-  2. Creates a summary record in inspect_summary table
-  3. Marks all result records as complete (sets complete flag to True)
-  4. Updates header status to 'Completed'
+  1. Probes each section for at least one result
+  2. Validates that every section has results and that every required
+     question of every sample is answered (nothing is written if not)
+  3. Reads rejection metrics (unit_rejects and all_rejects) from the reject counters
+  4. Creates a summary record in inspect_summary table
+  5. Adds the inspection to the daily and monthly quality rollups
+  6. Updates header status to 'Completed', which marks all results as complete
+  
+  Steps 1-6 run in a single transaction, so the client does not need to call
+  validate_inspection_complete first. No results table is read in full.
   
   Args:
       inspection_id: The inspection ID
@@ -79,87 +226,155 @@ def complete_inspection(inspection_id, inspection_date, po_numb, rel_numb, serie
       sample_qty: Sample quantity inspected
   
   Returns:
-      dict: {'success': bool, 'message': str, 'unit_rejects': int, 'all_rejects': int, 'disposition': str}
+      dict: {'success': bool, 'message': str, 'unit_rejects': int, 'all_rejects': int,
+             'disposition': str, 'missing_sections': list}
   """
   print(f"=== COMPLETING INSPECTION {inspection_id} ===")
 
   try:
-    # Calculate rejection metrics
-    reject_metrics = calculate_rejection_metrics(inspection_id)
+    return _complete_inspection(inspection_id, inspection_date, po_numb, rel_numb, series, prod_code, sample_qty)
 
-    unit_rejects = reject_metrics['unit_rejects']
-    all_rejects = reject_metrics['all_rejects']
-
-    # Determine disposition
-    disposition = determine_disposition(unit_rejects, all_rejects)
-
-    print(f"Metrics calculated: unit_rejects={unit_rejects}, all_rejects={all_rejects}, disposition={disposition}")
-
-    # Create summary record
-    summary = app_tables.inspect_summary.add_row(
-      inspection_id=inspection_id,
-      inspection_date=inspection_date,
-      po_numb=po_numb,
-      rel_numb=rel_numb,
-      series=series,
-      prod_code=prod_code,
-      sample_qty=sample_qty,
-      unit_rejects=unit_rejects,
-      all_rejects=all_rejects,
-      completed_date=datetime.now()
-    )
-
-    print(f"Summary record created")
-
-    # Mark all results as complete
-    mark_results_complete(inspection_id)
-
-    print(f"All results marked as complete")
+  except Exception as e:
+    print(f"ERROR completing inspection: {str(e)}")
+    return {
+      'success': False,
+      'message': str(e),
+      'unit_rejects': 0,
+      'all_rejects': 0,
+      'disposition': 'ERROR',
+      'missing_sections': []
+    }
 
-    # Update header status
-    header = app_tables.inspect_head.get(id_head=inspection_id)
-    if header:
-      header['status'] = 'Completed'
-      print(f"Header status updated to Completed")
 
+@tables.in_transaction
+def _complete_inspection(inspection_id, inspection_date, po_numb, rel_numb, series, prod_code, sample_qty):
+  """Transactional body of complete_inspection (raises on error so the transaction is rolled back)."""
+  # A repeated or double-clicked completion returns the first one's result
+  # instead of adding a second summary and counting it into the rollups again
+  existing = app_tables.inspect_summary.get(inspection_id=inspection_id)
+  if existing or is_inspection_complete(inspection_id):
+    print(f"Inspection {inspection_id} is already complete")
     return {
       'success': True,
-      'message': f'Inspection {inspection_id} completed successfully',
-      'unit_rejects': unit_rejects,
-      'all_rejects': all_rejects,
-      'disposition': disposition
+      'message': f'Inspection {inspection_id} was already completed',
+      'unit_rejects': existing['unit_rejects'] if existing else 0,
+      'all_rejects': existing['all_rejects'] if existing else 0,
+      'disposition': existing['disposition'] if existing else None,
+      'missing_sections': []
     }
 
-  except Exception as e:
-    print(f"ERROR completing inspection: {str(e)}")
+  # Stops at the first row of each section
+  missing_sections = find_missing_sections(inspection_id)
+  if missing_sections:
+    print(f"Missing sections: {missing_sections}")
     return {
       'success': False,
-      'message': str(e),
+      'message': "\n".join([f"• {section}" for section in missing_sections]),
+      'unit_rejects': 0,
+      'all_rejects': 0,
+      'disposition': None,
+      'missing_sections': missing_sections
+    }
+
+  # Every required question of every sample must be answered by now; the
+  # section saves accept partial answers so inspectors can split the samples
+  incomplete_sections = find_incomplete_sections(inspection_id, series, sample_qty)
+  if incomplete_sections:
+    print(f"Incomplete sections: {incomplete_sections}")
+    return {
+      'success': False,
+      'message': "\n".join([f"• {section}" for section in incomplete_sections]),
       'unit_rejects': 0,
       'all_rejects': 0,
-      'disposition': 'ERROR'
+      'disposition': None,
+      'missing_sections': incomplete_sections
     }
 
+  # Rejection metrics come from the counters maintained by the section saves
+  reject_metrics = reject_counters.reject_metrics(inspection_id)
+
+  unit_rejects = reject_metrics['unit_rejects']
+  all_rejects = reject_metrics['all_rejects']
+
+  # Determine disposition from the rules for this series and sample size
+  disposition, rule_id = disposition_rules.evaluate(
+    disposition_rules.compiled_rules(), unit_rejects, all_rejects,
+    series=series, sample_qty=sample_size(sample_qty)
+  )
+
+  print(f"Metrics calculated: unit_rejects={unit_rejects}, all_rejects={all_rejects}, disposition={disposition}")
+
+  # Create summary record
+  completed_date = datetime.now()
+  summary = app_tables.inspect_summary.add_row(
+    inspection_id=inspection_id,
+    inspection_date=inspection_date,
+    po_numb=po_numb,
+    rel_numb=rel_numb,
+    series=series,
+    prod_code=prod_code,
+    sample_qty=sample_qty,
+    unit_rejects=unit_rejects,
+    all_rejects=all_rejects,
+    disposition=disposition,
+    disposition_rule=rule_id,
+    completed_date=completed_date,
+    in_rollups=True
+  )
+
+  print(f"Summary record created")
+
+  # Keep the dashboard rollups in step with the summary records
+  add_to_rollups(completed_date, series, prod_code, sample_qty, unit_rejects, all_rejects, disposition)
+
+  # Update header status - this one write marks every result of the inspection
+  # as complete (see is_inspection_complete), however many answers it has
+  header = app_tables.inspect_head.get(id_head=inspection_id)
+  if header:
+    header['status'] = STATUS_COMPLETED
+    print(f"Header status updated to Completed")
+
+  return {
+    'success': True,
+    'message': f'Inspection {inspection_id} completed successfully',
+    'unit_rejects': unit_rejects,
+    'all_rejects': all_rejects,
+    'disposition': disposition,
+    'missing_sections': []
+  }
+
 
 def calculate_rejection_metrics(inspection_id):
   """
-  Calculate unit_rejects and all_rejects for an inspection.
+  Calculate unit_rejects and all_rejects for an inspection by rescanning its results.
+  
+  Normal reads should use reject_counters.reject_metrics, which does not scan.
+  
+  Args:
+      inspection_id: The inspection ID
+  
+  Returns:
+      dict: {'unit_rejects': int, 'all_rejects': int, 'details': dict}
+  """
+  return metrics_from_rows(load_section_rows(inspection_id))
+
+
+def metrics_from_rows(rows_by_section):
+  """
+  Calculate unit_rejects and all_rejects from already loaded result rows.
   
   Logic:
   - unit_rejects: Count of distinct samples that have at least one 'Fail' or 'Reject'
   - all_rejects: Total count of all 'Fail' or 'Reject' answers across all samples
   
   Args:
-      inspection_id: The inspection ID
+      rows_by_section: Result rows per section, as returned by load_section_rows
   
   Returns:
       dict: {'unit_rejects': int, 'all_rejects': int, 'details': dict}
   """
   print(f"=== CALCULATING REJECTION METRICS ===")
 
-  # Track samples with rejects (for unit_rejects)
-  samples_with_rejects = set()
-
   # Track total rejects (for all_rejects)
   total_rejects = 0
 
@@ -172,62 +387,25 @@ def calculate_rejection_metrics(inspection_id):
   }
 
   # Check Document Results (no samples, just questions)
-  doc_results = app_tables.document_results.search(inspection_id=inspection_id)
-  for result in doc_results:
-    pass_fail = result['pass_fail']
-    if pass_fail and pass_fail.upper() in ['FAIL', 'REJECT']:
+  for result in rows_by_section['document']:
+    if is_reject(result['pass_fail']):
       total_rejects += 1
       details['document']['rejects'] += 1
 
-  # Check Visual Results (sample-based)
-  # FIXED: Changed from sample_id to sample_number
-  visual_results = app_tables.visual_results.search(inspection_id=inspection_id)
-  for result in visual_results:
-    sample_number = result['sample_number']
-    pass_fail = result['pass_fail']
-
-    if pass_fail and pass_fail.upper() in ['FAIL', 'REJECT']:
-      total_rejects += 1
-      samples_with_rejects.add(f"visual_{sample_number}")
-      details['visual']['rejects'] += 1
-      details['visual']['samples'].add(sample_number)
-
-  # Check Dimension Results (sample-based)
-  # FIXED: Changed from sample_id to sample_number
-  dimension_results = app_tables.dimension_results.search(inspection_id=inspection_id)
-  for result in dimension_results:
-    sample_number = result['sample_number']
-    pass_fail = result['pass_fail']
-
-    if pass_fail and pass_fail.upper() in ['FAIL', 'REJECT']:
-      total_rejects += 1
-      samples_with_rejects.add(f"dimension_{sample_number}")
-      details['dimension']['rejects'] += 1
-      details['dimension']['samples'].add(sample_number)
-
-  # Check Functional Results (sample-based)
-  # FIXED: Changed from sample_id to sample_number
-  functional_results = app_tables.functional_results.search(inspection_id=inspection_id)
-  for result in functional_results:
-    sample_number = result['sample_number']
-    pass_fail = result['pass_fail']
-
-    if pass_fail and pass_fail.upper() in ['FAIL', 'REJECT']:
-      total_rejects += 1
-      samples_with_rejects.add(f"functional_{sample_number}")
-      details['functional']['rejects'] += 1
-      details['functional']['samples'].add(sample_number)
+  # Check Visual, Dimension and Functional Results (sample-based)
+  for section in ('visual', 'dimension', 'functional'):
+    for result in rows_by_section[section]:
+      if is_reject(result['pass_fail']):
+        total_rejects += 1
+        details[section]['rejects'] += 1
+        details[section]['samples'].add(result['sample_number'])
 
   # Calculate unit_rejects (count of unique samples with at least one reject)
   # Note: A sample might have rejects in multiple inspection types (visual, dimension, functional)
   # We need to count unique physical samples, not inspection types
-
-  # Extract just the sample numbers (removing the inspection type prefix)
   unique_sample_numbers = set()
-  for sample_key in samples_with_rejects:
-    # Extract sample number from keys like "visual_sample_1"
-    sample_num = sample_key.split('_')[-1]
-    unique_sample_numbers.add(sample_num)
+  for section in ('visual', 'dimension', 'functional'):
+    unique_sample_numbers |= details[section]['samples']
 
   unit_rejects = len(unique_sample_numbers)
 
@@ -242,63 +420,83 @@ def calculate_rejection_metrics(inspection_id):
   }
 
 
-def determine_disposition(unit_rejects, all_rejects):
+def determine_disposition(unit_rejects, all_rejects, series=None, vendor_tier=None, sample_qty=None):
   """
   Determine the disposition based on rejection metrics.
   
-  Logic:
-  - ACCEPT: No rejects
-  - HOLD: Some rejects but not critical (can be refined based on business rules)
-  - REJECT: Critical number of rejects
+  Logic comes from the disposition_rules table (see disposition_rules.py):
+  - ACCEPT: Rejects within the matching rule's accept numbers
+  - HOLD: Some rejects but not enough to reject
+  - REJECT: Rejects at or above the rule's reject numbers
+  Without a matching rule the original thresholds apply (no rejects to accept,
+  at most 1 unit and 3 rejects to hold).
   
   Args:
       unit_rejects: Number of units with at least one reject
       all_rejects: Total number of all rejects
+      series: Optional product series, to pick a series-specific rule
+      vendor_tier: Optional vendor tier, to pick a tier-specific rule
+      sample_qty: Optional sample size, to pick a sampling-plan rule
   
   Returns:
       str: 'ACCEPT', 'HOLD', or 'REJECT'
   """
-  # Simple logic - can be enhanced with business rules
-  if all_rejects == 0:
-    return 'ACCEPT'
-  elif unit_rejects <= 1 and all_rejects <= 3:
-    return 'HOLD'  # Minor issues - may need review
-  else:
-    return 'REJECT'  # Significant issues
+  disposition, _ = disposition_rules.evaluate(
+    disposition_rules.compiled_rules(), unit_rejects, all_rejects, series, vendor_tier, sample_qty
+  )
+  return disposition
+
+
+def is_inspection_complete(inspection_id):
+  """
+  Whether an inspection (and so every one of its results) is complete.
+  
+  Completion is stored once, as the header status, and the per-result
+  'complete' flag is derived from it rather than written to every row.
+  """
+  header = app_tables.inspect_head.get(id_head=inspection_id)
+  return bool(header) and header['status'] == STATUS_COMPLETED
 
 
-def mark_results_complete(inspection_id):
+@tables.in_transaction
+def mark_results_complete(inspection_id, rows_by_section=None):
   """
-  Mark all result records as complete (set complete flag to True).
+  Write the complete flag onto every result row in one batched transaction.
+  
+  complete_inspection no longer needs this (see is_inspection_complete); it is
+  kept for backfilling the 'complete' column for tools that read it directly.
   
   Args:
       inspection_id: The inspection ID
+      rows_by_section: Result rows already loaded by load_section_rows (read here if None)
   """
   print(f"=== MARKING RESULTS AS COMPLETE ===")
 
-  # Mark Document Results as complete
-  doc_results = app_tables.document_results.search(inspection_id=inspection_id)
-  for result in doc_results:
-    result['complete'] = True
-  print(f"Marked {len(doc_results)} document results as complete")
+  if rows_by_section is None:
+    rows_by_section = load_section_rows(inspection_id)
 
-  # Mark Visual Results as complete
-  visual_results = app_tables.visual_results.search(inspection_id=inspection_id)
-  for result in visual_results:
-    result['complete'] = True
-  print(f"Marked {len(visual_results)} visual results as complete")
+  with tables.batch_update:
+    for section, rows in rows_by_section.items():
+      for result in rows:
+        result['complete'] = True
+      print(f"Marked {len(rows)} {section} results as complete")
 
-  # Mark Dimension Results as complete
-  dimension_results = app_tables.dimension_results.search(inspection_id=inspection_id)
-  for result in dimension_results:
-    result['complete'] = True
-  print(f"Marked {len(dimension_results)} dimension results as complete")
 
-  # Mark Functional Results as complete
-  functional_results = app_tables.functional_results.search(inspection_id=inspection_id)
-  for result in functional_results:
-    result['complete'] = True
-  print(f"Marked {len(functional_results)} functional results as complete")
+def summary_to_dict(summary):
+  """Convert an inspect_summary row to the dict sent to the client."""
+  return {
+    'inspection_id': summary['inspection_id'],
+    'inspection_date': summary['inspection_date'],
+    'po_numb': summary['po_numb'],
+    'rel_numb': summary['rel_numb'],
+    'series': summary['series'],
+    'prod_code': summary['prod_code'],
+    'sample_qty': summary['sample_qty'],
+    'unit_rejects': summary['unit_rejects'],
+    'all_rejects': summary['all_rejects'],
+    'disposition': summary['disposition'],
+    'completed_date': summary['completed_date']
+  }
 
 
 @anvil.server.callable
@@ -315,27 +513,97 @@ def get_inspection_summary(inspection_id):
   summary = app_tables.inspect_summary.get(inspection_id=inspection_id)
 
   if summary:
-    return {
-      'inspection_id': summary['inspection_id'],
-      'inspection_date': summary['inspection_date'],
-      'po_numb': summary['po_numb'],
-      'rel_numb': summary['rel_numb'],
-      'series': summary['series'],
-      'prod_code': summary['prod_code'],
-      'sample_qty': summary['sample_qty'],
-      'unit_rejects': summary['unit_rejects'],
-      'all_rejects': summary['all_rejects'],
-      'completed_date': summary['completed_date']
-    }
+    return summary_to_dict(summary)
 
   return None
 
 
+@anvil.server.callable
+def get_latest_completed_inspection():
+  """
+  Get the most recently completed inspection.
+  
+  Only the first row of the ordered search is read.
+  
+  Returns:
+      dict: Summary data or None if no inspection has been completed
+  """
+  for summary in app_tables.inspect_summary.search(tables.order_by('completed_date', ascending=False)):
+    return summary_to_dict(summary)
+
+  return None
+
+
+@anvil.server.callable
+def get_completed_inspections_page(cursor=None, page_size=25, date_from=None, date_to=None, series=None, po_numb=None):
+  """
+  Get one page of completed inspections, newest first.
+  
+  Pages are keyed on (completed_date, inspection_id) of the last row shown,
+  so each call reads only about page_size rows however long the history is.
+  
+  Args:
+      cursor: 'next_cursor' from the previous page, or None for the first page
+      page_size: Number of inspections per page (at most MAX_PAGE_SIZE)
+      date_from: Optional earliest inspection_date (inclusive)
+      date_to: Optional latest inspection_date (inclusive)
+      series: Optional product series filter
+      po_numb: Optional purchase order filter
+  
+  Returns:
+      dict: {'items': list of summary dicts, 'next_cursor': dict or None when there are no more pages}
+  """
+  page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+  filters = {}
+  if series:
+    filters['series'] = series
+  if po_numb:
+    filters['po_numb'] = po_numb
+  if date_from and date_to:
+    filters['inspection_date'] = q.between(date_from, date_to, max_inclusive=True)
+  elif date_from:
+    filters['inspection_date'] = q.greater_than_or_equal_to(date_from)
+  elif date_to:
+    filters['inspection_date'] = q.less_than_or_equal_to(date_to)
+  if cursor:
+    filters['completed_date'] = q.less_than_or_equal_to(cursor['completed_date'])
+
+  summaries = app_tables.inspect_summary.search(
+    tables.order_by('completed_date', ascending=False),
+    tables.order_by('inspection_id', ascending=False),
+    **filters
+  )
+
+  items = []
+  has_more = False
+  for summary in summaries:
+    # Skip rows up to and including the cursor row when completion times tie
+    if cursor and summary['completed_date'] == cursor['completed_date'] and summary['inspection_id'] >= cursor['inspection_id']:
+      continue
+    if len(items) == page_size:
+      has_more = True
+      break
+    items.append(summary_to_dict(summary))
+
+  next_cursor = None
+  if has_more:
+    next_cursor = {
+      'completed_date': items[-1]['completed_date'],
+      'inspection_id': items[-1]['inspection_id']
+    }
+
+  return {'items': items, 'next_cursor': next_cursor}
+
+
 @anvil.server.callable
 def get_all_completed_inspections():
   """
   Get all completed inspections from the summary table.
   
+  This sends the whole history to the caller - use get_completed_inspections_page
+  or get_latest_completed_inspection instead where possible.
+  
   Returns:
       list: List of summary records
   """
@@ -343,18 +611,4 @@ def get_all_completed_inspections():
     tables.order_by('completed_date', ascending=False)
   )
 
-  return [
-    {
-      'inspection_id': s['inspection_id'],
-      'inspection_date': s['inspection_date'],
-      'po_numb': s['po_numb'],
-      'rel_numb': s['rel_numb'],
-      'series': s['series'],
-      'prod_code': s['prod_code'],
-      'sample_qty': s['sample_qty'],
-      'unit_rejects': s['unit_rejects'],
-      'all_rejects': s['all_rejects'],
-      'completed_date': s['completed_date']
-    }
-    for s in summaries
-  ]
+  return [summary_to_dict(s) for s in summaries]
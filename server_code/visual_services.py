@@ -7,6 +7,10 @@ import anvil.tables as tables
 import anvil.tables.query as q
 from anvil.tables import app_tables
 from datetime import datetime
+from . import result_versions
+from . import save_requests
+from . import reject_counters
+from .summary_services import is_inspection_complete
 
 @anvil.server.callable
 def get_visual_questions(product_series):
@@ -20,58 +24,115 @@ def get_visual_questions(product_series):
   for question in questions:
     question_list.append({
       'question_id': question['question_id'],
-      'question_text': question['question_text']
+      'question_text': question['question_text'],
+      'optional': bool(question['is_optional'])
     })
 
   question_list.sort(key=lambda x: x['question_id'])
   return question_list
 
-@anvil.server.callable
-def save_visual_inspection_results(inspection_id, sample_results, inspector_name):
-  """Save all visual inspection results to the visual_results table - Updates existing or inserts new"""
-  try:
-    updated_count = 0
-    inserted_count = 0
-
-    for sample_key, questions in sample_results.items():
-      sample_number = int(sample_key.split('_')[1])
-
-      for question_id, result in questions.items():
-        # Check if record already exists
-        existing_row = app_tables.visual_results.get(
+@tables.in_transaction
+def _write_visual_results(inspection_id, sample_results, inspector_name):
+  """
+  Check and write every result of one save in a single transaction, so the
+  version compare and the write of each cell are atomic: a concurrent save of
+  the same cell makes this one retry and see the newer version as a conflict.
+  The reject/progress counters are updated in the same transaction.
+
+  Returns:
+      Outcome dict
+  """
+  updated_count = 0
+  inserted_count = 0
+  conflicts = []
+  versions = {}
+  counter_deltas = reject_counters.new_deltas()  # Applied to the reject/progress counters
+  counters = reject_counters.ensure_counters(inspection_id)
+
+  for sample_key, questions in sample_results.items():
+    sample_number = int(sample_key.split('_')[1])
+
+    for question_id, result in questions.items():
+      # Check if record already exists
+      existing_row = app_tables.visual_results.get(
+        inspection_id=inspection_id,
+        sample_number=sample_number,
+        question_id=question_id
+      )
+
+      if existing_row and result_versions.is_stale(existing_row, result):
+        # Another inspector saved this cell after we loaded it
+        if not result_versions.same_answer(existing_row, result, 'notes'):
+          conflicts.append(result_versions.conflict(sample_key, question_id, existing_row, result, 'notes', ('photo',)))
+        versions.setdefault(sample_key, {})[question_id] = result_versions.row_version(existing_row)
+        continue
+
+      if existing_row:
+        # Update existing record
+        reject_counters.add_cell_change(counter_deltas, str(sample_number), existing_row['pass_fail'], result.get('pass_fail'))
+        existing_row['pass_fail'] = result.get('pass_fail', 'Not Answered')
+        existing_row['notes'] = result.get('notes', '')
+        existing_row['photo'] = result.get('photo', None)  # Add photo update
+        existing_row['inspected_by'] = inspector_name
+        existing_row['update_datetime'] = datetime.now()
+        existing_row['row_version'] = result_versions.row_version(existing_row) + 1
+        versions.setdefault(sample_key, {})[question_id] = existing_row['row_version']
+        updated_count += 1
+      else:
+        # Insert new record
+        reject_counters.add_cell_change(counter_deltas, str(sample_number), None, result.get('pass_fail'))
+        app_tables.visual_results.add_row(
           inspection_id=inspection_id,
           sample_number=sample_number,
-          question_id=question_id
+          question_id=question_id,
+          pass_fail=result.get('pass_fail', 'Not Answered'),
+          notes=result.get('notes', ''),
+          photo=result.get('photo', None),  # Add photo insert
+          inspected_by=inspector_name,
+          update_datetime=datetime.now(),
+          row_version=1
         )
+        versions.setdefault(sample_key, {})[question_id] = 1
+        inserted_count += 1
+
+  message = f'Results saved successfully - Updated: {updated_count}, New: {inserted_count}'
+  if conflicts:
+    message += f', Conflicts: {len(conflicts)}'
+
+  outcome = {
+    'success': True, 
+    'message': message,
+    'conflicts': conflicts,
+    'versions': versions
+  }
+  reject_counters.add_deltas(counters, 'visual', counter_deltas)
+  if updated_count or inserted_count:
+    reject_counters.bump_results_version(counters)
+  return outcome
 
-        if existing_row:
-          # Update existing record
-          existing_row['pass_fail'] = result.get('pass_fail', 'Not Answered')
-          existing_row['notes'] = result.get('notes', '')
-          existing_row['photo'] = result.get('photo', None)  # Add photo update
-          existing_row['inspected_by'] = inspector_name
-          existing_row['update_datetime'] = datetime.now()
-          updated_count += 1
-        else:
-          # Insert new record
-          app_tables.visual_results.add_row(
-            inspection_id=inspection_id,
-            sample_number=sample_number,
-            question_id=question_id,
-            pass_fail=result.get('pass_fail', 'Not Answered'),
-            notes=result.get('notes', ''),
-            photo=result.get('photo', None),  # Add photo insert
-            inspected_by=inspector_name,
-            update_datetime=datetime.now()
-          )
-          inserted_count += 1
-
-    return {
-      'success': True, 
-      'message': f'Results saved successfully - Updated: {updated_count}, New: {inserted_count}'
-    }
+@anvil.server.callable
+def save_visual_inspection_results(inspection_id, sample_results, inspector_name, request_id=None):
+  """
+  Save all visual inspection results to the visual_results table - Updates existing or inserts new.
+
+  Results that carry a 'version' are only written if nobody else changed the cell
+  since that version was read; stale cells are returned in 'conflicts' instead.
+  A retry with the same request_id returns the first call's outcome without saving again.
+  """
+  # A retried request that already completed gets its original outcome back
+  cached = save_requests.claim(request_id, 'visual', inspection_id)
+  if cached is not None:
+    return cached
+
+  try:
+    outcome = _write_visual_results(inspection_id, sample_results, inspector_name)
+    save_requests.finish(request_id, outcome)
+    return outcome
   except Exception as e:
-    return {'success': False, 'message': str(e)}
+    # The transaction was rolled back - neither results nor counters were written
+    outcome = {'success': False, 'message': str(e)}
+    save_requests.finish(request_id, outcome)
+    return outcome
 
 @anvil.server.callable
 def get_visual_inspection_summary(inspection_id):
@@ -113,5 +174,39 @@ def get_visual_inspection_summary(inspection_id):
 
   return summary
 
+@anvil.server.callable
+def get_visual_results_for_inspection(inspection_id):
+  """
+  Get all visual inspection results for a specific inspection.
+  Used by inspect_visual to start from the answers already saved.
+  
+  Args:
+      inspection_id: Unique identifier for the inspection
+      
+  Returns:
+      Dictionary organized by sample and question containing:
+        - pass_fail: The answer ('Pass', 'Fail', or 'NA')
+        - notes: Inspector notes (if any)
+        - photo: Uploaded photo (if any)
+        - inspected_by: Name of inspector
+        - update_datetime: When the result was recorded
+        - version: Row version, for conflict-aware saves
+        - complete: True once the inspection has been completed
+  """
+  results = app_tables.visual_results.search(inspection_id=inspection_id)
+  complete = is_inspection_complete(inspection_id)
 
+  organized_results = {}
+  for result in results:
+    sample_key = f"sample_{result['sample_number']}"
+    organized_results.setdefault(sample_key, {})[result['question_id']] = {
+      'pass_fail': result['pass_fail'],
+      'notes': result['notes'],
+      'photo': result['photo'],
+      'inspected_by': result['inspected_by'],
+      'update_datetime': result['update_datetime'],
+      'version': result_versions.row_version(result),
+      'complete': complete
+    }
 
+  return organized_results